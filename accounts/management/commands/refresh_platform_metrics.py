@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.platform import refresh_platform_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the platform metrics shown on the superadmin dashboard (run every few minutes from cron)'
+
+    def handle(self, *args, **options):
+        metrics = refresh_platform_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Platform metrics refreshed: MRR {metrics['mrr']}, "
+            f"{metrics['active_subscriptions']} active subscriptions, "
+            f"{metrics['invoice_count']} invoices this month"
+        ))
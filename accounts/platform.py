@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from payments.models import Invoice
+from properties.models import LeaseAgreement, Property, PropertyUnit
+from .models import PropertyOwner, PropertyOwnerSubscription
+
+OWNERS_PER_PAGE = 25
+# Owner table columns that can be sorted on, with the ordering each one maps to
+OWNER_SORTS = {
+    'name': ('user__first_name', 'user__last_name'),
+    'company': ('company_name',),
+    'joined': ('user__date_joined',),
+    'properties': ('property_count',),
+    'units': ('unit_count',),
+    'leases': ('lease_count',),
+    'subscriptions': ('subscription_count',),
+}
+DEFAULT_OWNER_SORT = 'name'
+
+PLATFORM_METRICS_KEY = 'platform:metrics'
+# refresh_platform_metrics runs well inside this; if it stops, the snapshot
+# expires and the dashboard computes one itself
+PLATFORM_METRICS_TIMEOUT = 60 * 60
+
+
+def per_owner(queryset, owner_lookup, aggregate, output_field=None):
+    """
+    Correlated subquery of ``aggregate`` over the rows of ``queryset`` that
+    belong to the outer PropertyOwner (through ``owner_lookup``), 0 when there
+    are none
+    """
+    totals = queryset.filter(**{owner_lookup: OuterRef('pk')}).order_by().values(owner_lookup).annotate(
+        value=aggregate
+    ).values('value')
+    output_field = output_field or IntegerField()
+    return Coalesce(Subquery(totals, output_field=output_field), Value(0), output_field=output_field)
+
+
+def parse_owner_sort(value):
+    """``(field, descending)`` for a ``sort`` parameter like 'units' or '-units', falling back to the default"""
+    descending = bool(value) and value.startswith('-')
+    field = value[1:] if descending else value
+    if field not in OWNER_SORTS:
+        return DEFAULT_OWNER_SORT, False
+    return field, descending
+
+
+def active_subscriptions(now=None):
+    """Subscriptions that are running, as ``PropertyOwnerSubscription.is_active`` defines it"""
+    return PropertyOwnerSubscription.objects.filter(status='active', end_date__gt=now or timezone.now())
+
+
+def owner_table(sort=DEFAULT_OWNER_SORT, descending=False):
+    """
+    Every property owner with its property, unit, active lease and active
+    subscription counts, in one query. Each count is a correlated subquery
+    rather than a join, so the counts don't multiply each other and a page
+    only costs the rows on it.
+    """
+    ordering = OWNER_SORTS[sort]
+    if descending:
+        ordering = tuple(f'-{field}' for field in ordering)
+    return PropertyOwner.objects.select_related('user').annotate(
+        property_count=per_owner(Property.objects.all(), 'owner', Count('id')),
+        unit_count=per_owner(PropertyUnit.objects.all(), 'property__owner', Count('id')),
+        lease_count=per_owner(LeaseAgreement.objects.filter(status='active'), 'property__owner', Count('id')),
+        subscription_count=per_owner(active_subscriptions(), 'property_owner', Count('id')),
+    ).order_by(*ordering, 'id')
+
+
+def compute_platform_metrics(now=None):
+    """
+    Platform-wide figures for the superadmin dashboard: owner, property and
+    unit counts, active subscriptions and the monthly recurring revenue they
+    bring in (each package's price spread over its duration), and this
+    month's invoice volume.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    month_start = today.replace(day=1)
+
+    subscriptions = active_subscriptions(now).aggregate(
+        count=Count('id'),
+        mrr=Sum(ExpressionWrapper(
+            F('subscription__price') / F('subscription__duration_months'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )),
+    )
+    invoices = Invoice.objects.filter(issue_date__gte=month_start, issue_date__lte=today).exclude(
+        status='cancelled'
+    ).aggregate(
+        count=Count('id'),
+        billed=Sum('total_amount'),
+        collected=Sum('total_amount', filter=Q(status='paid')),
+    )
+
+    return {
+        'owner_count': PropertyOwner.objects.count(),
+        'property_count': Property.objects.count(),
+        'unit_count': PropertyUnit.objects.count(),
+        'active_subscriptions': subscriptions['count'],
+        'mrr': Decimal(subscriptions['mrr'] or 0).quantize(Decimal('0.01')),
+        'invoice_month': month_start,
+        'invoice_count': invoices['count'],
+        'invoice_billed': invoices['billed'] or Decimal('0.00'),
+        'invoice_collected': invoices['collected'] or Decimal('0.00'),
+        'generated_at': now,
+    }
+
+
+def refresh_platform_metrics():
+    """Recompute the platform metrics snapshot and cache it"""
+    metrics = compute_platform_metrics()
+    cache.set(PLATFORM_METRICS_KEY, metrics, PLATFORM_METRICS_TIMEOUT)
+    return metrics
+
+
+def get_platform_metrics():
+    """The cached platform metrics snapshot, computed on the spot if there is none"""
+    metrics = cache.get(PLATFORM_METRICS_KEY)
+    if metrics is None:
+        metrics = refresh_platform_metrics()
+    return metrics
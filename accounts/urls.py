@@ -47,9 +47,9 @@ urlpatterns = [
     #analytics
     path('property-analytics/', overall_property_analytics, name='property_analytics'),
 
-    # Notifications
-    path('notifications/', views.notifications_list, name='notifications_list'),
-    path('notifications/<int:notification_id>/mark-as-read/', views.mark_as_read, name='mark_as_read'),
+    # Legacy account notifications (JSON); /notifications/ belongs to the notifications app
+    path('account-notifications/', views.notifications_list, name='notifications_list'),
+    path('account-notifications/<int:notification_id>/mark-as-read/', views.mark_as_read, name='mark_as_read'),
 
     # Property Owner Management
     path('property-owner/<int:pk>/', views.property_owner_detail, name='property_owner_detail'),
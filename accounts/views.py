@@ -5,9 +5,10 @@ from django.http import JsonResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Q
+from django.db.models import Count, DecimalField, Prefetch, Q, Sum
 from django.views.generic import CreateView, UpdateView
 from django.urls import reverse_lazy
+from django.core.paginator import Paginator
 from .forms import (
     CustomUserCreationForm, PropertyOwnerRegistrationForm,
     TenantRegistrationForm, PropertyOwnerUpdateForm,
@@ -17,7 +18,10 @@ from payments.models import Payment
 from .models import CustomUser, PropertyOwner, Tenant, Subscription, PropertyOwnerSubscription
 from properties.models import (
     LeaseAgreement, Property, TenantProperty, PropertyMaintenance,
-    PropertyManager
+    PropertyManager, PropertyImage
+)
+from .platform import (
+    OWNERS_PER_PAGE, get_platform_metrics, owner_table, parse_owner_sort, per_owner
 )
 from payments.models import Payment,Invoice
 from django.utils import timezone
@@ -47,14 +51,22 @@ def superadmin_dashboard(request):
         messages.error(request, 'Access denied. Superadmin privileges required.')
         return redirect('accounts:dashboard')
 
-    property_owners = PropertyOwner.objects.all()
-    subscription_packages = Subscription.objects.all()
-    active_subscriptions = PropertyOwnerSubscription.objects.filter(is_active=True).count()
+    sort, descending = parse_owner_sort(request.GET.get('sort', ''))
+    paginator = Paginator(owner_table(sort, descending), OWNERS_PER_PAGE)
+    property_owners = paginator.get_page(request.GET.get('page'))
+
+    # Header links sort ascending first, then toggle
+    owner_sort_links = {
+        field: f'-{field}' if field == sort and not descending else field
+        for field in ('name', 'company', 'properties', 'units', 'leases', 'subscriptions')
+    }
 
     context = {
         'property_owners': property_owners,
-        'subscription_packages': subscription_packages,
-        'active_subscriptions': active_subscriptions,
+        'subscription_packages': Subscription.objects.all(),
+        'metrics': get_platform_metrics(),
+        'sort': f'-{sort}' if descending else sort,
+        'owner_sort_links': owner_sort_links,
     }
     return render(request, 'accounts/superadmin_dashboard.html', context)
 
@@ -116,27 +128,46 @@ def dashboard(request):
 
     if user.is_superuser:
         # Superadmin: Show property owners list and system stats
-        context['property_owners'] = PropertyOwner.objects.all()
-        context['subscription_packages'] = Subscription.objects.all()
-        return render(request, 'accounts/superadmin_dashboard.html', context)
+        return superadmin_dashboard(request)
 
     # Check user type and display appropriate dashboard
     if request.user.is_property_owner():
         try:
-            # Get the property owner
-            property_owner = PropertyOwner.objects.get(user=request.user)
+            # Get the property owner with the headline figures in one query
+            property_owner = PropertyOwner.objects.annotate(
+                total_properties=per_owner(Property.objects.all(), 'owner', Count('id')),
+                total_tenants=per_owner(
+                    LeaseAgreement.objects.filter(status='active'),
+                    'property_unit__property__owner',
+                    Count('tenant', distinct=True)
+                ),
+                invoice_total=per_owner(
+                    Invoice.objects.all(), 'property__owner', Sum('total_amount'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ),
+                pending_requests=per_owner(
+                    PropertyMaintenance.objects.filter(status='pending'), 'property__owner', Count('id')
+                ),
+            ).get(user=request.user)
+
+            # Recent properties with their unit counts and first image, so the
+            # table doesn't query per row
+            properties = Property.objects.filter(owner=property_owner).annotate(
+                unit_count=Count('units'),
+                occupied_unit_count=Count('units', filter=Q(units__is_available=False)),
+            ).prefetch_related(
+                Prefetch('images', queryset=PropertyImage.objects.order_by('id')[:1], to_attr='first_images')
+            ).order_by('-created_at')[:5]
+
             context = {
                 'property_owner': property_owner,
-                'properties': Property.objects.filter(owner=property_owner),
+                'properties': properties,
+                'total_properties': property_owner.total_properties,
+                'total_tenants': property_owner.total_tenants,
+                'invoice_total': property_owner.invoice_total,
+                'pending_requests': property_owner.pending_requests,
             }
 
-            # Add total properties and tenants
-            context['total_properties'] = context['properties'].count()
-            context['total_tenants'] = Tenant.objects.filter(
-                leaseagreement__property_unit__property__owner=property_owner,
-                leaseagreement__status='active'
-            ).distinct().count()
-
             # Add recent lease agreements
             context['lease_agreements'] = LeaseAgreement.objects.filter(
                 property_unit__property__owner=property_owner
@@ -147,12 +178,6 @@ def dashboard(request):
                 property__owner=property_owner
             ).order_by('-reported_date')[:5]
 
-                        # Get recent invoices
-            context['invoice_total'] = Invoice.objects.filter(
-            property__owner=property_owner
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-
             return render(request, 'accounts/property_owner_dashboard.html', context)
 
         except PropertyOwner.DoesNotExist:
@@ -658,7 +683,7 @@ def payment_cancelled(request):
 def create_notification(request, message):
     notification = Notification(user=request.user, message=message)
     notification.save()
-    return redirect('notifications_list')
+    return redirect('accounts:notifications_list')
 
 @login_required
 def notifications_list(request):
@@ -679,64 +704,7 @@ def mark_as_read(request, notification_id):
     notification = Notification.objects.get(id=notification_id, user=request.user)
     notification.is_read = True
     notification.save()
-    return redirect('notifications_list')
-
-@login_required
-def property_analytics(request):
-    if not request.user.is_property_owner():
-        messages.error(request, 'Access denied. Property owner privileges required.')
-        return redirect('accounts:dashboard')
-
-    owner = PropertyOwner.objects.get(user=request.user)
-
-    # Get date range from request or default to last 30 days
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=30)
-
-    # Get all invoices for this owner
-    invoices = Invoice.objects.filter(
-        property__owner=owner,
-        created_at__range=[start_date, end_date]
-    )
-
-    # Calculate total revenue
-    total_revenue = invoices.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
-    # Calculate paid vs pending amounts
-    paid_amount = invoices.filter(status='paid').aggregate(
-        Sum('total_amount'))['total_amount__sum'] or 0
-    pending_amount = invoices.filter(status='pending').aggregate(
-        Sum('total_amount'))['total_amount__sum'] or 0
-
-    # Get revenue by property
-    property_revenue = list(invoices.values('property__title').annotate(
-        total=Sum('total_amount')
-    ).order_by('-total'))
-
-    # Get payment type distribution
-    payment_types = list(invoices.values('payment_type').annotate(
-        count=Sum('total_amount')
-    ).order_by('-count'))
-
-    # Get monthly trend
-    monthly_trend = list(invoices.filter(
-        status='paid'
-    ).values('created_at__month').annotate(
-        total=Sum('total_amount')
-    ).order_by('created_at__month'))
-
-    context = {
-        'total_revenue': total_revenue,
-        'paid_amount': paid_amount,
-        'pending_amount': pending_amount,
-        'property_revenue': json.dumps(property_revenue, cls=DjangoJSONEncoder),
-        'payment_types': json.dumps(payment_types, cls=DjangoJSONEncoder),
-        'monthly_trend': json.dumps(monthly_trend, cls=DjangoJSONEncoder),
-        'start_date': start_date,
-        'end_date': end_date,
-    }
-
-    return render(request, 'accounts/property_analytics.html', context)
+    return redirect('accounts:notifications_list')
 
 @login_required
 def subscription_edit(request, package_id):
@@ -1,3 +1,20 @@
 from django.contrib import admin
+from .models import ArchivedNotification, OutboundEmail
 
 # Register your models here.
+
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'recipient', 'notification_type', 'created_at', 'archived_at')
+    list_filter = ('notification_type',)
+    search_fields = ('title', 'recipient__username')
+    raw_id_fields = ('recipient',)
+
+admin.site.register(ArchivedNotification, ArchivedNotificationAdmin)
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'claimed_at')
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
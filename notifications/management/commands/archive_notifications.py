@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from notifications.archival import archive_notifications, open_archive_file, BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Move read notifications past their retention period out of the notifications table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of notifications archived and deleted per batch')
+        parser.add_argument('--to-file', action='store_true',
+                            help='Write compressed JSON lines under MEDIA_ROOT instead of the archive table')
+        parser.add_argument('--type', dest='notification_type',
+                            help='Only archive this notification type')
+        parser.add_argument('--days', type=int,
+                            help='Retention in days for --type (defaults to NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        retention = None
+        if options['notification_type']:
+            days = options['days']
+            if days is None:
+                days = settings.NOTIFICATION_RETENTION_DAYS.get(options['notification_type'])
+            if days is None:
+                raise CommandError(f"No retention configured for {options['notification_type']}; pass --days")
+            retention = {options['notification_type']: days}
+        elif options['days'] is not None:
+            raise CommandError('--days requires --type')
+
+        if options['to_file'] and not options['dry_run']:
+            with open_archive_file() as archive_file:
+                archived = archive_notifications(retention, options['batch_size'], archive_file)
+            self.stdout.write(f'Archive written to {archive_file.name}')
+        else:
+            archived = archive_notifications(retention, options['batch_size'], dry_run=options['dry_run'])
+
+        for notification_type, count in archived.items():
+            self.stdout.write(f'{notification_type}: {count}')
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(archived.values())} notifications'))
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+from payments.models import Invoice
+from utils.email_rendering import render_email
+
+class Command(BaseCommand):
+    help = 'Measure the per-message cost of rendering invoice emails, before and after the email rendering layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Messages rendered per measurement')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG is on, so compiled templates are not cached'))
+
+        invoices = list(Invoice.objects.select_related('property', 'tenant__user')[:options['count']])
+        if not invoices:
+            raise CommandError('No invoices to render; run seed_portfolio first')
+        contexts = [
+            {'invoice': invoice, 'property': invoice.property, 'tenant': invoice.tenant}
+            for invoice in (invoices * (options['count'] // len(invoices) + 1))[:options['count']]
+        ]
+
+        for template_name in ('emails/invoice_created.html', 'emails/invoice_notification.html'):
+            # Warm both paths so neither pays for the first compile
+            render_to_string(template_name, contexts[0])
+            render_email(template_name, contexts[0])
+
+            started = time.perf_counter()
+            for context in contexts:
+                strip_tags(render_to_string(template_name, context))
+            baseline = (time.perf_counter() - started) / len(contexts)
+
+            started = time.perf_counter()
+            for context in contexts:
+                render_email(template_name, context)
+            layered = (time.perf_counter() - started) / len(contexts)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{template_name}: render_to_string + strip_tags {baseline * 1e6:.0f}us/message, '
+                f'render_email {layered * 1e6:.0f}us/message ({baseline / layered:.1f}x)'
+            ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from notifications.outbox import send_messages_batched
+
+class Command(BaseCommand):
+    help = 'Compare one-connection-per-email sending with batched sending against an SMTP sink'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost', help='SMTP sink host, e.g. `python -m aiosmtpd -n -l localhost:1025`')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--count', type=int, default=200, help='Messages sent per strategy')
+        parser.add_argument('--per-connection', type=int, default=None,
+                            help='Messages per connection when batching (defaults to EMAIL_MAX_MESSAGES_PER_CONNECTION)')
+
+    def handle(self, *args, **options):
+        connection_kwargs = {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': options['host'],
+            'port': options['port'],
+            'username': '',
+            'password': '',
+            'use_tls': False,
+            'use_ssl': False,
+        }
+        messages = [
+            EmailMultiAlternatives(
+                subject=f'Benchmark message {i}',
+                body='Plain text body',
+                from_email='benchmark@example.com',
+                to=[f'tenant{i}@example.com']
+            )
+            for i in range(options['count'])
+        ]
+        for message in messages:
+            message.attach_alternative('<p>HTML body</p>', 'text/html')
+
+        # What send_mail does: a fresh connection (and handshake) per email
+        started = time.monotonic()
+        for message in messages:
+            get_connection(fail_silently=False, **connection_kwargs).send_messages([message])
+        self._report('one connection per email', len(messages), time.monotonic() - started)
+
+        started = time.monotonic()
+        results = send_messages_batched(messages, options['per_connection'], connection_kwargs)
+        self._report('batched connections', results.count(None), time.monotonic() - started)
+
+    def _report(self, strategy, sent, seconds):
+        self.stdout.write(self.style.SUCCESS(
+            f'{strategy}: {sent} emails in {seconds:.2f}s ({sent / seconds:.0f} emails/sec)'
+        ))
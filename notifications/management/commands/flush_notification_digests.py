@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from notifications.utils import flush_notification_digests, BULK_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Deliver buffered notifications whose digest window has closed, one digest per recipient and type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE,
+                            help='Number of recipients flushed per transaction')
+        parser.add_argument('--no-email', action='store_true',
+                            help='Create the digest notifications without emailing them')
+
+    def handle(self, *args, **options):
+        sent = flush_notification_digests(batch_size=options['batch_size'], send_email=not options['no_email'])
+        self.stdout.write(self.style.SUCCESS(f'Delivered {sent} digest notifications'))
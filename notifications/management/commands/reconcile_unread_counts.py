@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notifications.utils import reconcile_unread_counts, BULK_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Recount unread notifications from the database and refresh the cached per-user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE,
+                            help='Number of users recounted per query')
+
+    def handle(self, *args, **options):
+        reconciled = reconcile_unread_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled unread notification counts for {reconciled} users'))
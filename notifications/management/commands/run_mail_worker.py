@@ -0,0 +1,17 @@
+from notifications.outbox import process_outbox, BATCH_SIZE
+from utils.queue import QueueWorkerCommand
+
+class Command(QueueWorkerCommand):
+    help = 'Send queued outbox emails, retrying failures with exponential backoff'
+    item_name = 'emails'
+    batch_size = BATCH_SIZE
+    sleep = 5
+
+    def process_batch(self, batch_size):
+        return process_outbox(batch_size)
+
+    def batch_message(self, done, failed):
+        return f'Sent {done} emails, {failed} failed'
+
+    def summary_message(self, done, failed):
+        return f'Mail worker sent {done} emails ({failed} failures)'
@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.queue import claim_rows
+from .models import OutboundEmail
+
+BATCH_SIZE = 100
+# Retry delays stop doubling at this ceiling
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def enqueue_mail(subject, message, from_email, recipient_list, fail_silently=False, html_message=None):
+    """
+    Drop-in replacement for ``send_mail`` that writes the email to the outbox
+    and returns at once; run_mail_worker delivers it. The row commits with
+    the caller's transaction, so an email is only sent if that work sticks.
+    ``fail_silently`` is accepted for compatibility; delivery errors are
+    retried by the worker instead.
+    """
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        # send_mail sends nothing for an empty recipient list either
+        return 0
+    OutboundEmail.objects.create(
+        subject=subject,
+        body=message or '',
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipients
+    )
+    return 1
+
+
+def enqueue_mass_mail(emails, batch_size=BATCH_SIZE):
+    """
+    Queue many emails with one insert per ``batch_size``. ``emails`` are
+    (subject, message, html_message, from_email, recipient_list) tuples.
+    Returns the number queued.
+    """
+    rows = [
+        OutboundEmail(
+            subject=subject,
+            body=message or '',
+            html_body=html_message or '',
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipients=[address for address in recipient_list if address]
+        )
+        for subject, message, html_message, from_email, recipient_list in emails
+    ]
+    rows = [row for row in rows if row.recipients]
+    OutboundEmail.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def send_messages_batched(messages, per_connection=None, connection_kwargs=None):
+    """
+    Send ``messages`` over as few SMTP connections as possible: one
+    authenticated connection carries up to ``per_connection`` messages
+    (``EMAIL_MAX_MESSAGES_PER_CONNECTION`` by default, to stay inside provider
+    limits) before it is replaced. A failed message only costs a reconnect.
+    Returns one entry per message: None when sent, otherwise the exception.
+    """
+    per_connection = per_connection or settings.EMAIL_MAX_MESSAGES_PER_CONNECTION
+    results = []
+    connection = None
+    sent_on_connection = 0
+    messages = list(messages)
+    try:
+        for position, message in enumerate(messages):
+            if connection is None or sent_on_connection >= per_connection:
+                if connection is not None:
+                    connection.close()
+                connection = get_connection(fail_silently=False, **(connection_kwargs or {}))
+                sent_on_connection = 0
+                try:
+                    connection.open()
+                except Exception as e:
+                    # Server unreachable: everything left waits for a retry
+                    connection = None
+                    results.extend([e] * (len(messages) - position))
+                    break
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                results.append(e)
+                # The connection may be unusable after an SMTP error; start afresh
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+            else:
+                results.append(None)
+                sent_on_connection += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    return results
+
+
+def claim_emails(batch_size=BATCH_SIZE, now=None):
+    """
+    Mark up to ``batch_size`` due emails as being sent by this worker and
+    return them. Rows locked by another worker are skipped, so several
+    workers can drain the outbox side by side.
+    """
+    now = now or timezone.now()
+    return claim_rows(
+        OutboundEmail, Q(status='pending', next_attempt_at__lte=now), ('next_attempt_at', 'id'),
+        'sending', batch_size, now
+    )
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def record_sent(emails):
+    OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+        status='sent', sent_at=timezone.now(), last_error=''
+    )
+
+
+def record_failure(email, error):
+    """Schedule a retry with exponential backoff, or give up after the last attempt"""
+    email.attempts += 1
+    email.last_error = str(error)
+    email.claimed_at = None
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        delay = timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (email.attempts - 1))
+        email.next_attempt_at = timezone.now() + min(delay, MAX_RETRY_DELAY)
+    email.save(update_fields=['attempts', 'last_error', 'claimed_at', 'status', 'next_attempt_at'])
+
+
+def process_outbox(batch_size=BATCH_SIZE):
+    """
+    Send one claimed batch from the outbox. Returns (sent, failed) counts,
+    where failed emails have been rescheduled or given up on. Delivery is
+    at-least-once: a worker dying mid-batch leaves its claimed emails to be
+    sent again once the claim times out.
+    """
+    emails = claim_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent, failed = [], 0
+    results = send_messages_batched([build_message(email) for email in emails])
+    for email, error in zip(emails, results):
+        if error is None:
+            sent.append(email)
+        else:
+            record_failure(email, error)
+            failed += 1
+    record_sent(sent)
+    return len(sent), failed
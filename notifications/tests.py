@@ -1,3 +1,309 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from utils.pagination import CursorPaginator
+from utils.queue import CLAIM_TIMEOUT
+from .models import Notification, NotificationDigestItem, OutboundEmail
+from .outbox import MAX_RETRY_DELAY, claim_emails, enqueue_mail, process_outbox, record_failure
+from .utils import (
+    create_notification, flush_notification_digests, get_unread_count, mark_notifications_read, queue_notification,
+    unread_count_key
+)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='tenant', password='pass', user_type='tenant')
+        start = datetime(2025, 1, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc)
+        Notification.objects.bulk_create([
+            Notification(recipient=cls.user, notification_type='system', title=f'Notice {number}', message='-')
+            for number in range(7)
+        ])
+        # Pairs of rows share a timestamp (down to the microsecond) so paging has to break ties on id
+        for index, notification_id in enumerate(Notification.objects.order_by('id').values_list('id', flat=True)):
+            Notification.objects.filter(id=notification_id).update(created_at=start + timedelta(seconds=index // 2))
+        cls.expected = list(Notification.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def paginator(self, per_page=3):
+        return CursorPaginator(Notification.objects.filter(recipient=self.user), per_page)
+
+    def ids(self, page):
+        return [notification.id for notification in page]
+
+    def test_first_page(self):
+        page = self.paginator().get_page()
+
+        self.assertEqual(self.ids(page), self.expected[:3])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_walking_forward_visits_every_row_once(self):
+        paginator = self.paginator()
+        seen, page = [], paginator.get_page()
+        seen += self.ids(page)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen += self.ids(page)
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), 1)
+        self.assertTrue(page.has_previous())
+
+    def test_previous_cursor_returns_preceding_page(self):
+        paginator = self.paginator()
+        second = paginator.get_page(paginator.get_page().next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        self.assertEqual(self.ids(paginator.get_page(third.previous_cursor)), self.ids(second))
+        first = paginator.get_page(second.previous_cursor)
+        self.assertEqual(self.ids(first), self.expected[:3])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = self.paginator()
+
+        for cursor in ('not-a-cursor', base64.urlsafe_b64encode(b'{"d":"next"}').decode()):
+            self.assertEqual(self.ids(paginator.get_page(cursor)), self.expected[:3])
+
+    def test_tampered_cursor_values_fall_back_to_first_page(self):
+        paginator = self.paginator()
+
+        for payload in ({'d': 'next', 'v': ['yesterday', 'x']}, {'d': 'next', 'v': 5}, [1, 2]):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            self.assertEqual(self.ids(paginator.get_page(cursor)), self.expected[:3])
+
+    def test_empty_queryset(self):
+        page = CursorPaginator(Notification.objects.none(), 3).get_page()
+
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_other_pages())
+
+    def test_single_page_has_no_cursors(self):
+        page = self.paginator(per_page=10).get_page()
+
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertFalse(page.has_other_pages())
+
+
+class UnreadCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='tenant', password='pass', user_type='tenant')
+
+    def setUp(self):
+        cache.clear()
+        self.assertEqual(get_unread_count(self.user.pk), 0)
+
+    def notify(self):
+        return create_notification(self.user, 'system', 'Notice', 'Message')
+
+    def test_counter_follows_committed_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.notify()
+            self.notify()
+        self.assertEqual(get_unread_count(self.user.pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_notifications_read(self.user, Notification.objects.filter(pk=first.pk))
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+
+    def test_counter_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.notify()
+
+        self.assertEqual(cache.get(unread_count_key(self.user.pk)), 0)
+        self.assertTrue(callbacks)
+
+    def test_rolled_back_notification_leaves_counter_alone(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.notify()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(cache.get(unread_count_key(self.user.pk)), 0)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend whose every send fails, standing in for an unreachable SMTP server"""
+
+    def send_messages(self, email_messages):
+        raise SMTPException('Service unavailable')
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_SECONDS=60)
+class OutboxTests(TestCase):
+    def queue(self, count=1):
+        for number in range(count):
+            enqueue_mail(f'Subject {number}', 'Body', 'rms@example.com', [f'user{number}@example.com'])
+        return list(OutboundEmail.objects.order_by('id'))
+
+    def test_enqueue_skips_empty_recipient_lists(self):
+        self.assertEqual(enqueue_mail('Subject', 'Body', None, ['', None]), 0)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_process_sends_and_marks_sent(self):
+        self.queue(3)
+
+        self.assertEqual(process_outbox(), (3, 0))
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboundEmail.objects.filter(status='sent', sent_at__isnull=False).count(), 3)
+        self.assertEqual(process_outbox(), (0, 0))
+
+    def test_claim_takes_due_emails_in_batches(self):
+        first, second, later = self.queue(3)
+        OutboundEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        claimed = claim_emails(batch_size=1)
+
+        self.assertEqual([email.pk for email in claimed], [first.pk])
+        self.assertEqual([email.pk for email in claim_emails()], [second.pk])
+        self.assertEqual(claim_emails(), [])
+        self.assertEqual(OutboundEmail.objects.filter(status='sending').count(), 2)
+
+    def test_stale_claims_are_recovered(self):
+        email, = self.queue()
+        claim_emails()
+
+        self.assertEqual(claim_emails(), [])
+        recovered = claim_emails(now=timezone.now() + CLAIM_TIMEOUT + timedelta(seconds=1))
+        self.assertEqual([row.pk for row in recovered], [email.pk])
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingEmailBackend')
+    def test_failures_back_off_exponentially_then_give_up(self):
+        email, = self.queue()
+        delays = []
+        for attempt in range(1, 4):
+            started = timezone.now()
+            self.assertEqual(process_outbox(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, attempt)
+            self.assertIn('Service unavailable', email.last_error)
+            if email.status == 'pending':
+                delays.append(round((email.next_attempt_at - started).total_seconds()))
+                OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+        self.assertEqual(delays, [60, 120])
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(claim_emails(), [])
+
+    def test_retry_delay_is_capped(self):
+        email, = self.queue()
+        email.attempts = 20
+
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=50):
+            record_failure(email, 'Timed out')
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertLessEqual(email.next_attempt_at, timezone.now() + MAX_RETRY_DELAY)
+
+
+@override_settings(NOTIFICATION_DIGEST_WINDOWS={'payment_received': 15, 'maintenance_update': 30})
+class NotificationDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='owner', password='pass', user_type='property_owner', email='owner@example.com'
+        )
+        cls.other = CustomUser.objects.create_user(
+            username='other', password='pass', user_type='property_owner', email='other@example.com'
+        )
+
+    def buffer(self, recipient, notification_type='payment_received', minutes_ago=20, title='Payment'):
+        item = queue_notification(recipient, notification_type, title, f'{title} details')
+        NotificationDigestItem.objects.filter(pk=item.pk).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return item
+
+    def test_undigested_types_are_created_immediately(self):
+        notification = queue_notification(self.user, 'system', 'Welcome', 'Hello')
+
+        self.assertIsInstance(notification, Notification)
+        self.assertIsNotNone(notification.pk)
+        self.assertFalse(NotificationDigestItem.objects.exists())
+
+    def test_items_wait_for_their_window(self):
+        self.buffer(self.user, minutes_ago=10)
+        self.buffer(self.user, 'maintenance_update', minutes_ago=20)
+
+        self.assertEqual(flush_notification_digests(), 0)
+        self.assertEqual(NotificationDigestItem.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_single_item_is_delivered_as_is(self):
+        self.buffer(self.user, title='Rent received')
+
+        self.assertEqual(flush_notification_digests(), 1)
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.title, notification.message), ('Rent received', 'Rent received details'))
+        self.assertFalse(NotificationDigestItem.objects.exists())
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.subject, email.recipients), ('Rent received', ['owner@example.com']))
+
+    def test_several_items_become_one_digest(self):
+        self.buffer(self.user, minutes_ago=20, title='First')
+        self.buffer(self.user, minutes_ago=5, title='Second')
+        self.buffer(self.user, minutes_ago=1, title='Third')
+
+        self.assertEqual(flush_notification_digests(), 1)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.title, '3 Payment Received notifications')
+        self.assertEqual(notification.message.splitlines(), [
+            'First: First details', 'Second: Second details', 'Third: Third details',
+        ])
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertFalse(NotificationDigestItem.objects.exists())
+
+    def test_one_notification_and_email_per_recipient_and_type(self):
+        for recipient in (self.user, self.other):
+            self.buffer(recipient, title='Payment A')
+            self.buffer(recipient, title='Payment B')
+            self.buffer(recipient, 'maintenance_update', minutes_ago=40, title='Repair')
+
+        self.assertEqual(flush_notification_digests(), 4)
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient__username', 'notification_type')),
+            [('other', 'maintenance_update'), ('other', 'payment_received'),
+             ('owner', 'maintenance_update'), ('owner', 'payment_received')]
+        )
+        self.assertEqual(
+            sorted(address for email in OutboundEmail.objects.all() for address in email.recipients),
+            ['other@example.com', 'other@example.com', 'owner@example.com', 'owner@example.com']
+        )
+
+    def test_flush_without_email(self):
+        self.buffer(self.user)
+
+        self.assertEqual(flush_notification_digests(send_email=False), 1)
+
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_recipient_without_address_gets_no_email(self):
+        self.user.email = ''
+        self.user.save()
+        self.buffer(self.user)
+
+        self.assertEqual(flush_notification_digests(), 1)
+
+        self.assertFalse(OutboundEmail.objects.exists())
@@ -6,6 +6,7 @@ app_name = 'notifications'
 urlpatterns = [
     path('', views.notification_list, name='notification_list'),
     path('get-notifications/', views.get_notifications_ajax, name='get_notifications_ajax'),
+    path('stream/', views.notification_stream, name='notification_stream'),
     path('mark-as-read/<int:pk>/', views.mark_as_read, name='mark_as_read'),
     path('mark-all-read/', views.mark_all_read, name='mark_all_read'),
 ]
\ No newline at end of file
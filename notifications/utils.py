@@ -1,20 +1,307 @@
-from .models import Notification
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby
+
+from .models import Notification, NotificationDigestItem
+from .outbox import enqueue_mail
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from utils.email_rendering import render_email
 
-def create_notification(recipient, notification_type, title, message, related_object=None):
+BULK_BATCH_SIZE = 1000
+# Cached unread counts expire after a day, so any drift heals on its own even
+# between reconcile_unread_counts runs
+UNREAD_COUNT_TIMEOUT = 60 * 60 * 24
+
+def notification_version_key(user_id):
+    return f'notifications:version:{user_id}'
+
+def touch_notifications(*user_ids):
     """
-    Utility function to create notifications consistently across the project
+    Record that these users' notifications changed, waking their open
+    notification streams. Call after anything that creates, reads or deletes
+    notifications; inside a transaction it takes effect once that commits.
+    """
+    keys = [notification_version_key(user_id) for user_id in set(user_ids)]
+    transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None), robust=True)
+
+def get_notification_version(user_id):
+    """
+    Current change marker for a user's notifications. A missing (evicted) key
+    is re-created, which costs the stream one extra refresh at worst.
     """
-    notification = Notification.objects.create(
+    key = notification_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+def unread_count_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+def get_unread_count(user_id):
+    """
+    A user's unread notification count, served from the cache. Only a cold
+    (or expired) counter is counted from the database.
+    """
+    key = unread_count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.add(key, count, UNREAD_COUNT_TIMEOUT)
+    return max(count, 0)
+
+def adjust_unread_count(user_id, delta):
+    """
+    Move a cached unread counter by ``delta`` once the current transaction
+    commits, so a rollback leaves it alone. A counter that isn't cached is
+    left alone too; the next read counts it from the database.
+    """
+    def adjust():
+        try:
+            cache.incr(unread_count_key(user_id), delta)
+        except ValueError:
+            pass
+    transaction.on_commit(adjust, robust=True)
+
+def reset_unread_count(user_id, count=0):
+    """Overwrite a cached unread counter once the current transaction commits"""
+    transaction.on_commit(
+        lambda: cache.set(unread_count_key(user_id), count, UNREAD_COUNT_TIMEOUT), robust=True
+    )
+
+def reconcile_unread_counts(batch_size=BULK_BATCH_SIZE):
+    """
+    Recount every user's unread notifications from the database and overwrite
+    the cached counters, one grouped query per ``batch_size`` users.
+    Returns the number of users reconciled.
+    """
+    user_ids = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+    reconciled = 0
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            reconciled += _reconcile_unread_batch(batch)
+            batch = []
+    if batch:
+        reconciled += _reconcile_unread_batch(batch)
+    return reconciled
+
+def _reconcile_unread_batch(user_ids):
+    counts = dict(
+        Notification.objects.filter(recipient_id__in=user_ids, is_read=False)
+        .values_list('recipient_id').annotate(unread=Count('id')).order_by()
+    )
+    cache.set_many({unread_count_key(user_id): counts.get(user_id, 0) for user_id in user_ids}, UNREAD_COUNT_TIMEOUT)
+    return len(user_ids)
+
+def mark_notifications_read(user, notifications=None):
+    """
+    Mark ``notifications`` (default: all of ``user``'s) read, keeping the unread
+    counter and open notification streams in step. Returns the number marked.
+    """
+    if notifications is None:
+        marked = Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+        reset_unread_count(user.pk)
+    else:
+        marked = notifications.filter(recipient=user, is_read=False).update(is_read=True)
+        if marked:
+            adjust_unread_count(user.pk, -marked)
+    if marked:
+        touch_notifications(user.pk)
+    return marked
+
+def get_unread_notifications(user, limit=5):
+    """
+    The latest unread notifications and the unread count, as served to the
+    navbar dropdown by both the AJAX endpoint and the notification stream
+    """
+    notifications = Notification.objects.filter(recipient=user, is_read=False).order_by('-created_at')[:limit]
+
+    return {
+        'notifications': [serialize_notification(notification) for notification in notifications],
+        'unread_count': get_unread_count(user.pk)
+    }
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.get_notification_type_display(),
+        'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'is_read': notification.is_read,
+    }
+
+def build_notification(recipient, notification_type, title, message, related_object=None):
+    """
+    Build (but don't save) a notification, linked to ``related_object`` if given
+    """
+    notification = Notification(
         recipient=recipient,
         notification_type=notification_type,
         title=title,
         message=message
     )
-    
+
     if related_object:
         notification.content_type = ContentType.objects.get_for_model(related_object)
         notification.object_id = related_object.id
-        notification.save()
-    
-    return notification
\ No newline at end of file
+
+    return notification
+
+def create_notification(recipient, notification_type, title, message, related_object=None):
+    """
+    Utility function to create notifications consistently across the project
+    """
+    notification = build_notification(recipient, notification_type, title, message, related_object)
+    notification.save()
+    adjust_unread_count(notification.recipient_id, 1)
+    touch_notifications(notification.recipient_id)
+    return notification
+
+def create_notifications_bulk(notifications, batch_size=BULK_BATCH_SIZE):
+    """
+    Create many notifications at once from (recipient, notification_type, title,
+    message, related_object) tuples; ``related_object`` may be None.
+    Content types come from ContentType's per-process cache, so each model is
+    looked up at most once, and rows are written with a single bulk_create per
+    ``batch_size`` notifications. Returns the notification instances (MySQL
+    doesn't report primary keys from bulk inserts, so there they have none).
+    """
+    objects = [build_notification(*notification) for notification in notifications]
+    return _save_notifications(objects, batch_size)
+
+def _save_notifications(objects, batch_size=BULK_BATCH_SIZE):
+    created = Notification.objects.bulk_create(objects, batch_size=batch_size)
+    per_recipient = Counter(notification.recipient_id for notification in objects)
+    for recipient_id, count in per_recipient.items():
+        adjust_unread_count(recipient_id, count)
+    touch_notifications(*per_recipient)
+    return created
+
+def queue_notification(recipient, notification_type, title, message, related_object=None):
+    """
+    Like create_notification, but types with a NOTIFICATION_DIGEST_WINDOWS
+    entry are buffered and delivered later as part of a digest by
+    flush_notification_digests. Other types are created immediately.
+    """
+    return queue_notifications_bulk([(recipient, notification_type, title, message, related_object)])[0]
+
+def queue_notifications_bulk(notifications, batch_size=BULK_BATCH_SIZE):
+    """
+    Bulk form of queue_notification, taking the same tuples as
+    create_notifications_bulk. Returns the created notifications and buffered
+    digest items, in input order.
+    """
+    windows = settings.NOTIFICATION_DIGEST_WINDOWS
+    objects = []
+    for recipient, notification_type, title, message, related_object in notifications:
+        if notification_type not in windows:
+            objects.append(build_notification(recipient, notification_type, title, message, related_object))
+            continue
+        item = NotificationDigestItem(
+            recipient=recipient,
+            notification_type=notification_type,
+            title=title,
+            message=message
+        )
+        if related_object:
+            item.content_type = ContentType.objects.get_for_model(related_object)
+            item.object_id = related_object.id
+        objects.append(item)
+
+    immediate = [obj for obj in objects if isinstance(obj, Notification)]
+    if immediate:
+        _save_notifications(immediate, batch_size)
+    NotificationDigestItem.objects.bulk_create(
+        [obj for obj in objects if isinstance(obj, NotificationDigestItem)], batch_size=batch_size
+    )
+    return objects
+
+def flush_notification_digests(now=None, batch_size=BULK_BATCH_SIZE, send_email=True):
+    """
+    Deliver every buffered (recipient, type) group whose oldest item has waited
+    out its digest window: one notification (a digest when there are several
+    items) and one email per group. Returns the number of notifications sent.
+    """
+    now = now or timezone.now()
+    sent = 0
+    for notification_type, minutes in settings.NOTIFICATION_DIGEST_WINDOWS.items():
+        queued = NotificationDigestItem.objects.filter(notification_type=notification_type)
+        recipient_ids = list(
+            queued.values_list('recipient_id', flat=True)
+            .annotate(oldest=Min('created_at'))
+            .filter(oldest__lte=now - timedelta(minutes=minutes))
+            .order_by('recipient_id')
+        )
+        for start in range(0, len(recipient_ids), batch_size):
+            sent += _flush_digest_batch(queued.filter(recipient_id__in=recipient_ids[start:start + batch_size]), send_email)
+    return sent
+
+def _flush_digest_batch(queued, send_email):
+    with transaction.atomic():
+        # Skip rows another flusher has already claimed
+        items = list(
+            queued.select_for_update(skip_locked=True)
+            .select_related('recipient')
+            .order_by('recipient_id', 'created_at')
+        )
+        digests = [
+            _build_digest(list(recipient_items))
+            for _, recipient_items in groupby(items, key=lambda item: item.recipient_id)
+        ]
+        _save_notifications(digests)
+        NotificationDigestItem.objects.filter(id__in=[item.id for item in items]).delete()
+        if send_email:
+            for digest in digests:
+                _queue_digest_email(digest)
+    return len(digests)
+
+def _build_digest(items):
+    first = items[0]
+    if len(items) == 1:
+        return Notification(
+            recipient=first.recipient,
+            notification_type=first.notification_type,
+            title=first.title,
+            message=first.message,
+            content_type_id=first.content_type_id,
+            object_id=first.object_id
+        )
+
+    type_display = dict(Notification.NOTIFICATION_TYPES).get(first.notification_type, first.notification_type)
+    notification = Notification(
+        recipient=first.recipient,
+        notification_type=first.notification_type,
+        title=f'{len(items)} {type_display} notifications',
+        message='\n'.join(f'{item.title}: {item.message}' for item in items)
+    )
+    notification.digest_items = items
+    return notification
+
+def _queue_digest_email(notification):
+    recipient = notification.recipient
+    if not recipient.email:
+        return
+    html_message, plain_message = render_email('emails/notification_digest.html', {
+        'recipient': recipient,
+        'notification': notification,
+        'items': getattr(notification, 'digest_items', None),
+    })
+    enqueue_mail(
+        subject=notification.title,
+        message=plain_message,
+        html_message=html_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[recipient.email],
+    )
@@ -1,9 +1,25 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from .models import Notification
+from .utils import (
+    create_notification, get_notification_version, get_unread_count, get_unread_notifications,
+    mark_notifications_read, serialize_notification
+)
+from utils.pagination import CursorPaginator
+
+# Browsers reconnect this long after a notification stream ends
+STREAM_RETRY_MILLISECONDS = 3000
+# Comment line sent on idle streams so proxies don't drop them
+STREAM_HEARTBEAT_SECONDS = 15
 
 # Create your views here.
 
@@ -13,27 +29,31 @@ def notification_list(request):
     try:
         # Create a test notification if none exist
         if not Notification.objects.filter(recipient=request.user).exists():
-            Notification.objects.create(
+            create_notification(
                 recipient=request.user,
                 notification_type='system',
                 title='Welcome to RMS',
                 message='Welcome to the Rental Management System. This is a test notification.'
             )
         
-        notifications_list = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-        paginator = Paginator(notifications_list, 10)  # Show 10 notifications per page
+        notifications_list = Notification.objects.filter(recipient=request.user)
+        # Keyset pages over the (recipient, -created_at) index, 10 per page
+        paginator = CursorPaginator(notifications_list, 10, ordering=('-created_at', '-id'))
         
-        page = request.GET.get('page')
-        notifications = paginator.get_page(page)
+        notifications = paginator.get_page(request.GET.get('cursor'))
         
         context = {
             'notifications': notifications,
-            'total_count': notifications_list.count(),
-            'unread_count': notifications_list.filter(is_read=False).count()
+            'unread_count': get_unread_count(request.user.pk)
         }
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse(context)
+            return JsonResponse({
+                **context,
+                'notifications': [serialize_notification(notification) for notification in notifications],
+                'next_cursor': notifications.next_cursor,
+                'previous_cursor': notifications.previous_cursor,
+            })
             
         return render(request, 'notifications/notification_list.html', context)
         
@@ -47,29 +67,7 @@ def notification_list(request):
 def get_notifications_ajax(request):
     """Get notifications for AJAX requests"""
     try:
-        notifications = Notification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).order_by('-created_at')[:5]
-        
-        notifications_data = [{
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'type': notification.get_notification_type_display(),
-            'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'is_read': notification.is_read,
-        } for notification in notifications]
-        
-        unread_count = Notification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).count()
-        
-        return JsonResponse({
-            'notifications': notifications_data,
-            'unread_count': unread_count
-        })
+        return JsonResponse(get_unread_notifications(request.user))
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -78,8 +76,7 @@ def mark_as_read(request, pk):
     """Mark a specific notification as read"""
     try:
         notification = get_object_or_404(Notification, pk=pk, recipient=request.user)
-        notification.is_read = True
-        notification.save()
+        mark_notifications_read(request.user, Notification.objects.filter(pk=notification.pk))
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'success'})
@@ -96,7 +93,7 @@ def mark_as_read(request, pk):
 def mark_all_read(request):
     """Mark all notifications as read for the current user"""
     try:
-        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        mark_notifications_read(request.user)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'success'})
@@ -108,3 +105,48 @@ def mark_all_read(request):
             return JsonResponse({'error': str(e)}, status=500)
         messages.error(request, f'Error marking all notifications as read: {str(e)}')
         return redirect('notifications:notification_list')
+
+
+def _stream_user(request):
+    return request.user if request.user.is_authenticated else None
+
+async def notification_stream(request):
+    """
+    Server-sent events stream of the navbar notifications. Each open stream
+    only reads a per-user change marker from the cache, and queries the
+    database when that marker moves. Needs an ASGI server (rms/asgi.py).
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None or not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would tie up a worker; EventSource gives up
+        # on 204 and the page falls back to polling get_notifications_ajax
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        _notification_events(user, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def _notification_events(user, last_event_id=None):
+    yield f'retry: {STREAM_RETRY_MILLISECONDS}\n\n'
+
+    poll_seconds = settings.NOTIFICATION_STREAM_POLL_SECONDS
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+    sent_version = last_event_id
+    idle_seconds = 0
+    while time.monotonic() < deadline:
+        version = str(await sync_to_async(get_notification_version)(user.pk))
+        if version != sent_version:
+            data = await sync_to_async(get_unread_notifications)(user)
+            yield f'id: {version}\nevent: notifications\ndata: {json.dumps(data)}\n\n'
+            sent_version = version
+            idle_seconds = 0
+        elif idle_seconds >= STREAM_HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            idle_seconds = 0
+
+        await asyncio.sleep(poll_seconds)
+        idle_seconds += poll_seconds
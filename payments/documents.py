@@ -0,0 +1,42 @@
+from django.utils import timezone
+
+from utils.documents import PDFDocument
+
+
+def payment_receipt_document(payment):
+    """Receipt PDF for ``payment``; select_related its lease, property, unit, tenant and payer"""
+    lease = payment.lease_agreement
+    document = PDFDocument(title=f"Payment Receipt {payment.pk}")
+
+    # Header
+    document.heading(f"PAYMENT RECEIPT #{payment.pk}").spacer()
+
+    # Company Info
+    document.heading("Rental Management System", 2).spacer()
+
+    # Payment Details
+    payment_date = timezone.localtime(payment.payment_date) if payment.payment_date else None
+    details = [
+        ["Payment Date:", payment_date.strftime("%B %d, %Y") if payment_date else "-"],
+        ["Status:", payment.get_status_display()],
+        ["Payment Method:", payment.payment_method.replace('_', ' ').title() or "-"],
+    ]
+    if payment.transaction_id:
+        details.append(["Transaction ID:", payment.transaction_id])
+    if lease is not None:
+        details += [
+            ["Property:", lease.property.title],
+            ["Unit:", lease.property_unit.unit_number if lease.property_unit else "-"],
+            ["Tenant:", lease.tenant.user.get_full_name()],
+        ]
+    elif payment.paid_by is not None:
+        details.append(["Paid By:", payment.paid_by.get_full_name()])
+    document.table(details, 'details', (2, 4)).spacer()
+
+    # Amount Details
+    document.table([
+        ["Description", "Amount"],
+        [payment.get_payment_type_display(), f"₹{payment.amount}"],
+        ["Total Paid", f"₹{payment.amount}"],
+    ], 'amounts', (3, 3))
+    return document
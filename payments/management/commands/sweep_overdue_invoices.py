@@ -0,0 +1,52 @@
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max, Min, Value, DecimalField
+from django.utils import timezone
+from datetime import timedelta
+from payments.models import Invoice
+from properties.analytics import schedule_stats_refresh
+
+class Command(BaseCommand):
+    help = 'Mark past-due pending invoices as overdue and apply the late fee'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-days', type=int, default=settings.LATE_FEE_GRACE_DAYS,
+                            help='Days after the due date before an invoice becomes overdue')
+        parser.add_argument('--flat-fee', type=Decimal, default=Decimal(settings.LATE_FEE_FLAT),
+                            help='Fixed late fee added to each newly overdue invoice')
+        parser.add_argument('--percent-fee', type=Decimal, default=Decimal(settings.LATE_FEE_PERCENT),
+                            help='Late fee as a percentage of the invoice amount')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Invoice id range updated per statement')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now().date() - timedelta(days=options['grace_days'])
+        past_due = Invoice.objects.filter(status='pending', due_date__lt=cutoff)
+
+        fee = (
+            Value(options['flat_fee'], output_field=DecimalField(max_digits=10, decimal_places=2))
+            + F('amount') * (options['percent_fee'] / 100)
+        )
+
+        bounds = past_due.aggregate(first=Min('id'), last=Max('id'))
+        swept = 0
+        if bounds['first'] is not None:
+            # One short UPDATE per id range so the invoices table is never locked for long
+            for start in range(bounds['first'], bounds['last'] + 1, options['chunk_size']):
+                chunk = past_due.filter(id__range=(start, start + options['chunk_size'] - 1))
+                with transaction.atomic():
+                    rows = list(chunk.select_for_update().values_list('id', 'property_id', 'due_date'))
+                    if not rows:
+                        continue
+                    invoices = Invoice.objects.filter(id__in=[invoice_id for invoice_id, _, _ in rows])
+                    swept += invoices.update(late_fee=F('late_fee') + fee, status='overdue', updated_at=timezone.now())
+                    # A second statement, so the total reads the stored late fee
+                    # whatever order the database applies SET assignments in
+                    invoices.update(total_amount=F('amount') + F('late_fee'))
+                    # update() skips Invoice.save, so refresh the rollup months
+                    # (and the cached revenue series) here
+                    schedule_stats_refresh((property_id, due_date) for _, property_id, due_date in rows)
+
+        self.stdout.write(self.style.SUCCESS(f'Marked {swept} invoices overdue (due before {cutoff})'))
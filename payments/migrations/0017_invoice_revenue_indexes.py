@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_alter_subscription_type'),
+        ('payments', '0016_invoicenumbersequence'),
+        ('properties', '0035_propertymonthlystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['property', 'due_date'], name='payments_in_propert_71f80e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['property', 'payment_date'], name='payments_in_propert_3af24f_idx'),
+        ),
+    ]
@@ -53,6 +53,25 @@ class PaymentReminder(models.Model):
     def __str__(self):
         return f"Reminder for {self.payment}"
 
+class InvoiceNumberSequence(models.Model):
+    """Counter behind sequential invoice numbers, one row per prefix"""
+    prefix = models.CharField(max_length=20, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.prefix} (next {self.next_value})"
+
+    @classmethod
+    def allocate(cls, prefix, count):
+        """Reserve ``count`` consecutive numbers for ``prefix`` and return them as a range"""
+        with transaction.atomic():
+            sequence, _ = cls.objects.select_for_update().get_or_create(prefix=prefix)
+            first = sequence.next_value
+            sequence.next_value = first + count
+            sequence.save(update_fields=['next_value', 'updated_at'])
+        return range(first, first + count)
+
 class Invoice(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -104,8 +123,16 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Changes to these fields move the invoice's amounts in the monthly rollup
+    STATS_FIELDS = {'property', 'property_id', 'due_date', 'payment_date', 'status', 'total_amount'}
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Date range scans for revenue analytics
+            models.Index(fields=['property', 'due_date']),
+            models.Index(fields=['property', 'payment_date']),
+        ]
 
     def __str__(self):
         return f"Invoice {self.invoice_number} for {self.tenant}"
@@ -125,8 +152,32 @@ class Invoice(models.Model):
             if not self.total_amount:
                 self.total_amount = self.amount + self.late_fee
 
+        # Months of the property rollup this invoice counted towards before the change
+        update_fields = kwargs.get('update_fields')
+        tracks_stats = update_fields is None or bool(set(update_fields) & self.STATS_FIELDS)
+        previous = None
+        if tracks_stats and self.pk:
+            previous = Invoice.objects.filter(pk=self.pk).values_list('property_id', 'due_date', 'payment_date').first()
+
         super().save(*args, **kwargs)
 
+        if tracks_stats:
+            from properties.analytics import schedule_stats_refresh
+            schedule_stats_refresh(self.stats_months() + (self.stats_months(*previous) if previous else []))
+
+    def delete(self, *args, **kwargs):
+        months = self.stats_months()
+        result = super().delete(*args, **kwargs)
+        from properties.analytics import schedule_stats_refresh
+        schedule_stats_refresh(months)
+        return result
+
+    def stats_months(self, property_id=None, due_date=None, payment_date=None):
+        """(property id, month) rollup rows this invoice counts towards"""
+        if property_id is None:
+            property_id, due_date, payment_date = self.property_id, self.due_date, self.payment_date
+        return [(property_id, day) for day in (due_date, payment_date) if day]
+
     def generate_payment_url(self, request=None):
         """Generate Stripe checkout session for the invoice"""
         if not self.bank_account or self.bank_account.account_type != 'Stripe':
@@ -1,3 +1,163 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser, PropertyOwner, Tenant
+from properties.models import LeaseAgreement, Property, PropertyUnit
+from .models import Invoice, InvoiceNumberSequence
+from .utils import InvoiceNumberAllocator
+
+
+class InvoiceNumberAllocatorTests(TestCase):
+    def test_numbers_are_sequential_and_zero_padded(self):
+        numbers = InvoiceNumberAllocator().take(3)
+
+        self.assertEqual(numbers, ['RENT-000000001', 'RENT-000000002', 'RENT-000000003'])
+
+    def test_allocators_never_hand_out_the_same_number(self):
+        first, second = InvoiceNumberAllocator(), InvoiceNumberAllocator()
+
+        numbers = first.take(2) + second.take(2) + first.take(2)
+
+        self.assertEqual(len(set(numbers)), 6)
+        self.assertEqual(InvoiceNumberSequence.objects.get(prefix='RENT').next_value, 7)
+
+    def test_take_uses_reserved_block_first(self):
+        allocator = InvoiceNumberAllocator()
+        allocator.reserve(5)
+
+        numbers = allocator.take(3)
+
+        self.assertEqual(numbers, ['RENT-000000001', 'RENT-000000002', 'RENT-000000003'])
+        self.assertEqual(InvoiceNumberSequence.objects.get(prefix='RENT').next_value, 6)
+
+    def test_take_reserves_only_the_shortfall(self):
+        allocator = InvoiceNumberAllocator()
+        allocator.reserve(2)
+        InvoiceNumberAllocator().take(1)
+
+        numbers = allocator.take(3)
+
+        # Two from the reserved block, the third after the other allocator's number
+        self.assertEqual(numbers, ['RENT-000000001', 'RENT-000000002', 'RENT-000000004'])
+        self.assertEqual(allocator.take(1), ['RENT-000000005'])
+
+    def test_reserve_nothing_is_a_no_op(self):
+        InvoiceNumberAllocator().reserve(0)
+
+        self.assertFalse(InvoiceNumberSequence.objects.exists())
+
+    def test_prefixes_have_separate_sequences(self):
+        rent = InvoiceNumberAllocator().take(1)
+        deposit = InvoiceNumberAllocator(prefix='DEP').take(1)
+
+        self.assertEqual(rent, ['RENT-000000001'])
+        self.assertEqual(deposit, ['DEP-000000001'])
+
+
+class SweepOverdueInvoicesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = PropertyOwner.objects.create(
+            user=CustomUser.objects.create_user(username='owner', password='pass', user_type='property_owner')
+        )
+        cls.tenant = Tenant.objects.create(
+            user=CustomUser.objects.create_user(username='tenant', password='pass', user_type='tenant'),
+            emergency_contact='555-0100'
+        )
+        cls.property = Property.objects.create(
+            owner=owner, title='Elm Court', property_type='residential', address='1 Elm St',
+            city='Springfield', state='IL', postal_code='62701'
+        )
+        cls.unit = PropertyUnit.objects.create(
+            property=cls.property, unit_number='1A', monthly_rent=Decimal('1000.00'),
+            bedrooms=2, bathrooms=1, square_feet=800
+        )
+        cls.lease = LeaseAgreement.objects.create(
+            property=cls.property, property_unit=cls.unit, tenant=cls.tenant,
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31), monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'), terms_and_conditions='Standard terms'
+        )
+
+    def create_invoice(self, days_overdue=10, **fields):
+        values = {
+            'lease_agreement': self.lease, 'property': self.property, 'property_unit': self.unit,
+            'tenant': self.tenant, 'invoice_number': f'TEST-{Invoice.objects.count() + 1}',
+            'amount': Decimal('1000.00'), 'due_date': timezone.now().date() - timedelta(days=days_overdue),
+        }
+        values.update(fields)
+        return Invoice.objects.create(**values)
+
+    def sweep(self, *args):
+        call_command(
+            'sweep_overdue_invoices', '--flat-fee', '25', '--percent-fee', '5', '--grace-days', '3', *args,
+            stdout=StringIO()
+        )
+
+    def test_fee_is_flat_plus_percentage_of_amount(self):
+        invoice = self.create_invoice()
+
+        self.sweep()
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status, 'overdue')
+        self.assertEqual(invoice.late_fee, Decimal('75.00'))
+        self.assertEqual(invoice.total_amount, Decimal('1075.00'))
+
+    def test_total_includes_existing_late_fee(self):
+        invoice = self.create_invoice(late_fee=Decimal('10.00'))
+
+        self.sweep()
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.late_fee, Decimal('85.00'))
+        self.assertEqual(invoice.total_amount, Decimal('1085.00'))
+
+    def test_repeated_runs_do_not_accrue_twice(self):
+        invoice = self.create_invoice()
+
+        self.sweep()
+        self.sweep()
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.late_fee, Decimal('75.00'))
+        self.assertEqual(invoice.total_amount, Decimal('1075.00'))
+
+    def test_only_pending_invoices_past_grace_are_swept(self):
+        within_grace = self.create_invoice(days_overdue=2)
+        paid = self.create_invoice(status='paid')
+        cancelled = self.create_invoice(status='cancelled')
+
+        self.sweep()
+
+        for invoice in (within_grace, paid, cancelled):
+            status = invoice.status
+            invoice.refresh_from_db()
+            self.assertEqual((invoice.status, invoice.late_fee), (status, Decimal('0.00')))
+
+    def test_every_chunk_is_swept(self):
+        # Interleave invoices that must be skipped, so chunks of two hold one or two sweepable rows
+        swept, skipped = [], []
+        for number in range(7):
+            if number % 3 == 1:
+                skipped.append(self.create_invoice(days_overdue=1))
+            else:
+                swept.append(self.create_invoice())
+
+        self.sweep('--chunk-size', '2')
 
-# Create your tests here.
+        self.assertEqual(
+            set(Invoice.objects.filter(status='overdue').values_list('id', flat=True)),
+            {invoice.id for invoice in swept}
+        )
+        self.assertEqual(
+            set(Invoice.objects.filter(id__in=[invoice.id for invoice in swept]).values_list('late_fee', flat=True)),
+            {Decimal('75.00')}
+        )
+        self.assertFalse(
+            Invoice.objects.filter(id__in=[invoice.id for invoice in skipped]).exclude(status='pending').exists()
+        )
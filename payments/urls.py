@@ -13,6 +13,7 @@ urlpatterns = [
     path('<int:pk>/update/', views.PaymentUpdateView.as_view(), name='payment_update_view'),
     path('create-intent/<int:payment_id>/', views.create_payment_intent, name='create_payment_intent'),
     path('receipt/<int:pk>/', views.payment_receipt, name='payment_receipt'),
+    path('receipt/<int:pk>/download/', views.download_payment_receipt, name='download_payment_receipt'),
     path('payments/complete/', views.payment_complete, name='payment_complete'),
     path('payments/make/<int:lease_id>/', views.make_payment, name='make_payment'),
     path('payments/bulk-upload/', views.bulk_upload_payments, name='bulk_upload_payments'),
@@ -0,0 +1,29 @@
+from .models import InvoiceNumberSequence
+
+
+class InvoiceNumberAllocator:
+    """
+    Hands out dense, collision-free invoice numbers such as ``RENT-000001234``
+    from blocks reserved on ``InvoiceNumberSequence``, so a worker pays one
+    locked round-trip per block instead of one per invoice.
+    Use a separate allocator per process.
+    """
+
+    def __init__(self, prefix='RENT'):
+        self.prefix = prefix
+        self._next = self._end = 0
+
+    def reserve(self, count):
+        """Reserve a block of ``count`` numbers now, e.g. before a long transaction"""
+        if count > 0:
+            block = InvoiceNumberSequence.allocate(self.prefix, count)
+            self._next, self._end = block.start, block.stop
+
+    def take(self, count):
+        """Return ``count`` invoice numbers, reserving only the shortfall from the sequence"""
+        numbers = list(range(self._next, min(self._end, self._next + count)))
+        self._next += len(numbers)
+        if len(numbers) < count:
+            numbers.extend(InvoiceNumberSequence.allocate(self.prefix, count - len(numbers)))
+        # Nine digits never clash with the legacy eight-character uuid fragments
+        return [f"{self.prefix}-{number:09d}" for number in numbers]
@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Sum, Q
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
 from django.conf import settings
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
@@ -13,9 +13,11 @@ import stripe
 
 
 from .models import Payment, Invoice
+from .documents import payment_receipt_document
 from .forms import PaymentForm, PaymentListForm
 from properties.models import Property
 from accounts.models import PropertyOwner, Tenant
+from notifications.utils import create_notification, queue_notification
 
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
@@ -316,6 +318,33 @@ def payment_receipt(request, pk):
         'payment': payment
     })
 
+@login_required
+def download_payment_receipt(request, pk):
+    """Download a payment receipt as PDF, written straight into the response"""
+    payment = get_object_or_404(
+        Payment.objects.select_related(
+            'lease_agreement__property__owner__user',
+            'lease_agreement__property_unit',
+            'lease_agreement__tenant__user',
+            'paid_by'
+        ),
+        pk=pk
+    )
+
+    # Superadmins, the payer, and the tenant and owner of the lease
+    lease = payment.lease_agreement
+    allowed_users = {payment.paid_by_id}
+    if lease is not None:
+        allowed_users |= {lease.tenant.user_id, lease.property.owner.user_id}
+    if not (request.user.is_superadmin() or request.user.id in allowed_users):
+        messages.error(request, 'You are not authorized to view this receipt.')
+        return redirect('payments:payment_list_view')
+
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="receipt_{payment.pk}.pdf"'
+    payment_receipt_document(payment).write(response)
+    return response
+
 @login_required
 def bulk_upload_payments(request):
     if not (request.user.is_superadmin or request.user.is_property_owner):
@@ -776,8 +805,8 @@ def payment_success(request, pk):
         related_object=invoice
     )
 
-    # Create notification for property owner
-    create_notification(
+    # Create notification for property owner, coalesced into a digest
+    queue_notification(
         recipient=invoice.property.owner.user,
         notification_type='payment_received',
         title='Payment Received',
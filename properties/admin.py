@@ -42,8 +42,36 @@ class BankAccountAdmin(admin.ModelAdmin):
     list_filter = ('status', 'account_type', 'account_mode')
     search_fields = ('title', 'property__title')
 
+class RentScheduleEntryAdmin(admin.ModelAdmin):
+    list_display = ('lease', 'period', 'due_date', 'amount', 'status', 'invoice')
+    list_filter = ('status', 'due_date')
+    search_fields = ('lease__property__title', 'lease__tenant__user__username')
+    raw_id_fields = ('lease', 'invoice')
+    date_hierarchy = 'due_date'
+
+class InvoiceRunCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('due_from', 'due_to', 'partition', 'property_from', 'property_to', 'status', 'invoices_created', 'completed_at')
+    list_filter = ('status', 'due_from')
+
+class DocumentJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'filename', 'requested_by', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('filename', 'requested_by__username')
+    raw_id_fields = ('requested_by',)
+
+class PropertyMonthlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('property', 'month', 'billed', 'collected', 'outstanding', 'occupied_units', 'total_units', 'avg_rent', 'updated_at')
+    list_filter = ('month',)
+    search_fields = ('property__title',)
+    raw_id_fields = ('property',)
+    date_hierarchy = 'month'
+
 admin.site.register(Property, PropertyAdmin)
 admin.site.register(LeaseAgreement, LeaseAgreementAdmin)
 admin.site.register(PropertyMaintenance, PropertyMaintenanceAdmin)
 admin.site.register(PropertyUnit, PropertyUnitAdmin)
 admin.site.register(BankAccount, BankAccountAdmin)
+admin.site.register(RentScheduleEntry, RentScheduleEntryAdmin)
+admin.site.register(InvoiceRunCheckpoint, InvoiceRunCheckpointAdmin)
+admin.site.register(DocumentJob, DocumentJobAdmin)
+admin.site.register(PropertyMonthlyStats, PropertyMonthlyStatsAdmin)
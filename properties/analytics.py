@@ -0,0 +1,375 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, DecimalField, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from payments.models import Invoice
+from .models import Property, PropertyUnit, LeaseAgreement, TenantProperty, PropertyMonthlyStats
+
+STATS_FIELDS = ['billed', 'collected', 'outstanding', 'occupied_units', 'total_units', 'avg_rent']
+# Properties refreshed together by rebuild_monthly_stats
+REBUILD_BATCH_SIZE = 100
+
+SERIES_GRANULARITIES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+# Longest series revenue_series will build, in buckets
+MAX_SERIES_BUCKETS = 400
+# Cached series are also dropped as soon as one of the owner's invoices changes
+SERIES_CACHE_TIMEOUT = 60 * 60
+
+
+def month_bounds(day):
+    """First day of ``day``'s month and of the month after"""
+    start = day.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def months_between(start, end):
+    """First days of every month from ``start``'s through ``end``'s"""
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = month_bounds(month)[1]
+    return months
+
+
+def refresh_monthly_stats(pairs):
+    """
+    Recompute the ``PropertyMonthlyStats`` rows for ``pairs`` of (property id,
+    any day of the month) from the invoices, leases and units behind them.
+    Every pair is read with one grouped query per source table and written
+    with a single upsert, so a hook touching a few months and a rebuild of a
+    whole portfolio cost the same number of queries. Returns the rows written.
+
+    A month's occupancy counts the units with an active lease overlapping it
+    and ``avg_rent`` averages those leases' rent, matching the active-lease
+    rent shown on the analytics page. Unit history isn't kept (nor past
+    ``is_available`` flags), so ``total_units`` is the property's unit count
+    at refresh time; the current month's occupancy on the analytics page is
+    read live from the units instead.
+    """
+    pairs = {(property_id, month_start(day)) for property_id, day in pairs}
+    if not pairs:
+        return 0
+    property_ids = {property_id for property_id, _ in pairs}
+    first = min(month for _, month in pairs)
+    end = month_bounds(max(month for _, month in pairs))[1]
+
+    zero = Decimal('0.00')
+    stats = {pair: {'billed': zero, 'collected': zero, 'outstanding': zero} for pair in pairs}
+
+    billed = Invoice.objects.filter(
+        property_id__in=property_ids, due_date__gte=first, due_date__lt=end
+    ).values('property_id', month=TruncMonth('due_date')).annotate(
+        billed=Sum('total_amount', filter=~Q(status='cancelled')),
+        outstanding=Sum('total_amount', filter=Q(status__in=['pending', 'overdue']))
+    ).order_by()
+    for row in billed:
+        pair = (row['property_id'], row['month'])
+        if pair in stats:
+            stats[pair]['billed'] = row['billed'] or zero
+            stats[pair]['outstanding'] = row['outstanding'] or zero
+
+    collected = Invoice.objects.filter(
+        property_id__in=property_ids, status='paid', payment_date__gte=first, payment_date__lt=end
+    ).values('property_id', month=TruncMonth('payment_date')).annotate(
+        collected=Sum('total_amount')
+    ).order_by()
+    for row in collected:
+        pair = (row['property_id'], row['month'])
+        if pair in stats:
+            stats[pair]['collected'] = row['collected']
+
+    total_units = dict(
+        PropertyUnit.objects.filter(property_id__in=property_ids).values('property_id').annotate(
+            total=Count('id')
+        ).order_by().values_list('property_id', 'total')
+    )
+    leases = {}
+    for property_id, unit_id, start_date, end_date, rent in LeaseAgreement.objects.filter(
+        property_id__in=property_ids, status='active', start_date__lt=end, end_date__gte=first
+    ).values_list('property_id', 'property_unit_id', 'start_date', 'end_date', 'monthly_rent'):
+        leases.setdefault(property_id, []).append((unit_id, start_date, end_date, rent))
+
+    rows = []
+    for (property_id, month), values in stats.items():
+        next_month = month_bounds(month)[1]
+        current = [
+            (unit_id, rent) for unit_id, start_date, end_date, rent in leases.get(property_id, [])
+            if start_date < next_month and end_date >= month
+        ]
+        rents = [rent for _, rent in current]
+        rows.append(PropertyMonthlyStats(
+            property_id=property_id,
+            month=month,
+            occupied_units=len({unit_id for unit_id, _ in current if unit_id is not None}),
+            total_units=total_units.get(property_id, 0),
+            avg_rent=(sum(rents) / len(rents)).quantize(Decimal('0.01')) if rents else zero,
+            **values
+        ))
+
+    upsert = {'update_conflicts': True, 'update_fields': STATS_FIELDS + ['updated_at']}
+    if connection.features.supports_update_conflicts_with_target:
+        # MySQL infers the conflicting key itself and rejects an explicit one
+        upsert['unique_fields'] = ['property', 'month']
+    PropertyMonthlyStats.objects.bulk_create(rows, batch_size=1000, **upsert)
+
+    touch_revenue(*Property.objects.filter(id__in=property_ids).values_list('owner_id', flat=True))
+    return len(rows)
+
+
+def schedule_stats_refresh(pairs):
+    """
+    Refresh the rollup for ``pairs`` once the current transaction commits, so
+    it reads the committed rows. A failure is logged rather than raised: the
+    change being saved has already committed, and a rebuild repairs the rollup.
+    """
+    pairs = set(pairs)
+    if pairs:
+        transaction.on_commit(lambda: refresh_monthly_stats(pairs), robust=True)
+
+
+def rebuild_monthly_stats(property_ids=None, start=None, end=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recompute every rollup row of ``property_ids`` (default: all properties)
+    from ``start``'s month to ``end``'s, defaulting to the span of their
+    invoices and leases up to the current month (or the latest due date).
+    Returns the rows written.
+    """
+    properties = Property.objects.order_by('id')
+    if property_ids is not None:
+        properties = properties.filter(id__in=property_ids)
+    property_ids = list(properties.values_list('id', flat=True))
+    if not property_ids:
+        return 0
+
+    invoices = Invoice.objects.filter(property_id__in=property_ids).aggregate(first=Min('due_date'), last=Max('due_date'))
+    first_lease = LeaseAgreement.objects.filter(property_id__in=property_ids).exclude(status='pending').aggregate(
+        first=Min('start_date')
+    )['first']
+    today = timezone.now().date()
+    if start is None:
+        start = min([day for day in (invoices['first'], first_lease) if day] or [today])
+    if end is None:
+        end = max(today, invoices['last'] or today)
+
+    months = months_between(start, end)
+    written = 0
+    for offset in range(0, len(property_ids), batch_size):
+        batch = property_ids[offset:offset + batch_size]
+        written += refresh_monthly_stats((property_id, month) for property_id in batch for month in months)
+    return written
+
+
+def unit_stats_months(property_id, today=None):
+    """
+    (property id, month) rollup rows to refresh when a property's units
+    change: the current month and every later month that already has a row,
+    since each carries the property's current unit count
+    """
+    current_month = month_start(today or timezone.now().date())
+    later = PropertyMonthlyStats.objects.filter(property_id=property_id, month__gt=current_month).values_list(
+        'month', flat=True
+    )
+    return [(property_id, current_month)] + [(property_id, month) for month in later]
+
+
+def roll_forward_monthly_stats(today=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Refresh the current month's rollup row of every property. Run daily
+    (``rebuild_property_stats --current``) so properties without invoice or
+    lease activity in a month still get a row for it. Returns the rows written.
+    """
+    current_month = month_start(today or timezone.now().date())
+    property_ids = list(Property.objects.order_by('id').values_list('id', flat=True))
+    written = 0
+    for offset in range(0, len(property_ids), batch_size):
+        written += refresh_monthly_stats(
+            (property_id, current_month) for property_id in property_ids[offset:offset + batch_size]
+        )
+    return written
+
+
+def portfolio_analytics(property_ids, today=None):
+    """
+    KPIs for every property in ``property_ids``, keyed by property id.
+    Occupancy and rent are read live from the units and active leases (the
+    same definitions as ``Property.occupancy_rate``), each table once with a
+    ``GROUP BY property_id``; this month's collected revenue comes from the
+    current month's ``PropertyMonthlyStats`` rows instead of scanning
+    invoices. The number of queries is the same for one property as for a
+    whole portfolio.
+    """
+    current_month = month_start(today or timezone.now().date())
+
+    units = {
+        row['property_id']: row
+        for row in PropertyUnit.objects.filter(property__in=property_ids).values('property_id').annotate(
+            total_units=Count('id'),
+            occupied_units=Count('id', filter=Q(is_available=False))
+        ).order_by()
+    }
+    leases = {
+        row['property_unit__property_id']: row
+        for row in LeaseAgreement.objects.filter(property_unit__property__in=property_ids).values(
+            'property_unit__property_id'
+        ).annotate(
+            avg_rent=Avg('monthly_rent', filter=Q(status='active')),
+            active_leases=Count('id', filter=Q(status='active'))
+        ).order_by()
+    }
+    revenue = dict(
+        PropertyMonthlyStats.objects.filter(property_id__in=property_ids, month=current_month).values_list(
+            'property_id', 'collected'
+        )
+    )
+    tenants = dict(
+        TenantProperty.objects.filter(property__in=property_ids).values('property_id').annotate(
+            total_tenants=Count('id')
+        ).order_by().values_list('property_id', 'total_tenants')
+    )
+
+    analytics = {}
+    for property_id in property_ids:
+        unit_row = units.get(property_id, {})
+        lease_row = leases.get(property_id, {})
+        total_units = unit_row.get('total_units', 0)
+        occupied_units = unit_row.get('occupied_units', 0)
+        total_tenants = tenants.get(property_id, 0)
+        active_leases = lease_row.get('active_leases', 0)
+
+        occupancy_rate = (occupied_units / total_units * 100) if total_units > 0 else 0
+        tenant_turnover_rate = ((total_tenants - active_leases) / total_tenants * 100) if total_tenants > 0 else 0
+        analytics[property_id] = {
+            'occupancy_rate': round(occupancy_rate, 2),
+            'avg_rent': round(lease_row.get('avg_rent') or 0, 2),
+            'monthly_revenue': revenue.get(property_id) or 0,
+            'tenant_turnover_rate': round(tenant_turnover_rate, 2),
+            'total_units': total_units,
+            'occupied_units': occupied_units,
+            'total_tenants': total_tenants,
+            'active_leases': active_leases
+        }
+    return analytics
+
+
+def portfolio_rent_trend(property_ids, start, end):
+    """
+    Average rent across ``property_ids`` for each month from ``start`` to
+    ``end``, weighting each property's average by its occupied units
+    """
+    rows = PropertyMonthlyStats.objects.filter(
+        property_id__in=property_ids, month__gte=month_start(start), month__lte=end, occupied_units__gt=0
+    ).values('month').annotate(
+        rent=Sum(F('avg_rent') * F('occupied_units'), output_field=DecimalField(max_digits=16, decimal_places=2)),
+        units=Sum('occupied_units')
+    ).order_by('month')
+    return [(row['month'], round(row['rent'] / row['units'], 2)) for row in rows]
+
+
+def revenue_version_key(owner_id):
+    return f'analytics:revenue:version:{owner_id}'
+
+
+def touch_revenue(*owner_ids):
+    """Invalidate the cached revenue series of these property owners"""
+    version = time.time_ns()
+    cache.set_many({revenue_version_key(owner_id): version for owner_id in set(owner_ids)}, None)
+
+
+def get_revenue_version(owner_id):
+    key = revenue_version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def series_buckets(start, end, granularity):
+    """Start dates of the ``granularity`` buckets covering ``start`` to ``end``"""
+    if granularity == 'day':
+        bucket, step = start, lambda day: day + timedelta(days=1)
+    elif granularity == 'week':
+        # TruncWeek starts weeks on Monday
+        bucket, step = start - timedelta(days=start.weekday()), lambda day: day + timedelta(days=7)
+    else:
+        bucket, step = month_start(start), lambda day: month_bounds(day)[1]
+    buckets = []
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket = step(bucket)
+    return buckets
+
+
+def parse_series_params(params, default_start, default_end, default_granularity='month'):
+    """
+    ``(start, end, granularity)`` from ``start``/``end`` (YYYY-MM-DD) and
+    ``granularity`` request parameters; raises ValueError for bad values
+    """
+    start = date.fromisoformat(params['start']) if params.get('start') else default_start
+    end = date.fromisoformat(params['end']) if params.get('end') else default_end
+    granularity = params.get('granularity') or default_granularity
+    if start > end:
+        raise ValueError("start must not be after end")
+    if granularity not in SERIES_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(SERIES_GRANULARITIES)}")
+    return start, end, granularity
+
+
+def revenue_series(owner_id, start, end, granularity='month'):
+    """
+    Billed and collected amounts of an owner's invoices for each ``granularity``
+    bucket ('day', 'week' or 'month') from ``start`` to ``end`` inclusive, as
+    a list of ``{'period', 'billed', 'collected'}`` dicts with empty buckets
+    filled in. Billed follows ``due_date`` (excluding cancelled invoices),
+    collected follows ``payment_date`` of paid ones; both are range scans on
+    the (property, date) invoice indexes. Results are cached per owner, range
+    and granularity until one of the owner's invoices changes.
+    Raises ValueError for an unknown granularity or an over-long range.
+    """
+    if granularity not in SERIES_GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    buckets = series_buckets(start, end, granularity)
+    if len(buckets) > MAX_SERIES_BUCKETS:
+        raise ValueError(f"Range too long for {granularity} granularity")
+
+    key = f'analytics:revenue:{owner_id}:{get_revenue_version(owner_id)}:{start}:{end}:{granularity}'
+    series = cache.get(key)
+    if series is not None:
+        return series
+
+    trunc = SERIES_GRANULARITIES[granularity]
+    invoices = Invoice.objects.filter(property__owner_id=owner_id)
+    billed = dict(
+        invoices.filter(due_date__gte=start, due_date__lte=end).exclude(status='cancelled').values(
+            period=trunc('due_date')
+        ).annotate(total=Sum('total_amount')).order_by().values_list('period', 'total')
+    )
+    collected = dict(
+        invoices.filter(status='paid', payment_date__gte=start, payment_date__lte=end).values(
+            period=trunc('payment_date')
+        ).annotate(total=Sum('total_amount')).order_by().values_list('period', 'total')
+    )
+
+    series = [
+        {
+            'period': bucket,
+            'billed': billed.get(bucket) or Decimal('0.00'),
+            'collected': collected.get(bucket) or Decimal('0.00'),
+        }
+        for bucket in buckets
+    ]
+    cache.set(key, series, SERIES_CACHE_TIMEOUT)
+    return series
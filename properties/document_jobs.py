@@ -0,0 +1,96 @@
+import os
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.queue import claim_rows
+from .documents import cached_document_path, document_fingerprint, document_filename, document_objects
+from .models import DocumentJob
+
+BATCH_SIZE = 10
+MAX_ATTEMPTS = 3
+# Delay before the first retry of a failed render, doubling after each attempt
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def enqueue_document(kind, obj, user):
+    """
+    Job rendering ``obj``'s ``kind`` PDF for ``user``. A job already queued
+    (or finished) for the same content is reused, so repeated clicks on a
+    download link don't queue the same work twice.
+    """
+    fingerprint = document_fingerprint(kind, obj)
+    job = DocumentJob.objects.filter(
+        kind=kind,
+        object_id=obj.pk,
+        fingerprint=fingerprint,
+        requested_by=user,
+        status__in=['pending', 'rendering', 'ready']
+    ).order_by('-created_at').first()
+    if job is not None and (job.status != 'ready' or os.path.exists(job.file_path)):
+        return job
+    return DocumentJob.objects.create(
+        kind=kind,
+        object_id=obj.pk,
+        fingerprint=fingerprint,
+        requested_by=user,
+        filename=document_filename(kind, obj)
+    )
+
+
+def claim_jobs(batch_size=BATCH_SIZE, now=None):
+    """
+    Mark up to ``batch_size`` due pending jobs as rendering by this worker and
+    return them. Rows locked by another worker are skipped.
+    """
+    now = now or timezone.now()
+    return claim_rows(
+        DocumentJob, Q(status='pending', next_attempt_at__lte=now), ('next_attempt_at', 'id'),
+        'rendering', batch_size, now
+    )
+
+
+def render_job(job):
+    """
+    Render the job's document into the document cache; returns True when it
+    is ready. A failure is retried after an exponentially growing delay, up
+    to MAX_ATTEMPTS attempts. The attempt is recorded before rendering, so a
+    job whose render kills the worker (and comes back as a stale claim) runs
+    out of attempts too.
+    """
+    now = timezone.now()
+    if job.attempts >= MAX_ATTEMPTS:
+        job.error = job.error or 'The worker stopped while rendering this document'
+        job.status = 'failed'
+    else:
+        job.attempts += 1
+        DocumentJob.objects.filter(pk=job.pk).update(attempts=job.attempts)
+        try:
+            obj = document_objects(job.kind).get(pk=job.object_id)
+            job.file_path = cached_document_path(job.kind, obj)
+        except Exception as e:
+            job.error = str(e)
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'failed'
+            else:
+                job.status = 'pending'
+                job.next_attempt_at = now + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.error = ''
+            job.status = 'ready'
+    job.claimed_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['attempts', 'file_path', 'error', 'status', 'next_attempt_at', 'claimed_at', 'finished_at'])
+    return job.status == 'ready'
+
+
+def process_document_jobs(batch_size=BATCH_SIZE):
+    """Render one claimed batch of jobs. Returns (ready, failed) counts"""
+    ready = failed = 0
+    for job in claim_jobs(batch_size):
+        if render_job(job):
+            ready += 1
+        else:
+            failed += 1
+    return ready, failed
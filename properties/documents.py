@@ -0,0 +1,291 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import connections
+
+from payments.models import Invoice
+from utils.documents import PDFDocument
+from .models import LeaseAgreement
+
+# Bump when a document layout changes so every cached copy is re-rendered
+DOCUMENT_VERSION = 2
+
+
+def invoice_fields(invoice):
+    """Everything printed on an invoice PDF; the PDF cache is keyed on these values"""
+    return [
+        invoice.invoice_number,
+        invoice.issue_date.strftime("%B %d, %Y"),
+        invoice.due_date.strftime("%B %d, %Y"),
+        invoice.status.title(),
+        invoice.property.title,
+        invoice.lease_agreement.property_unit.unit_number if invoice.lease_agreement.property_unit else "-",
+        invoice.tenant.user.get_full_name(),
+        invoice.amount,
+        invoice.late_fee,
+        invoice.total_amount,
+    ]
+
+
+def lease_fields(lease):
+    """Everything printed on a lease agreement PDF; the PDF cache is keyed on these values"""
+    return [
+        lease.property.title,
+        lease.property.address,
+        lease.property_unit.unit_number if lease.property_unit else "-",
+        lease.start_date.strftime("%B %d, %Y"),
+        lease.end_date.strftime("%B %d, %Y"),
+        lease.monthly_rent,
+        lease.security_deposit,
+        lease.property.owner.user.get_full_name(),
+        lease.tenant.user.get_full_name(),
+    ]
+
+
+def invoice_document(invoice):
+    (invoice_number, issue_date, due_date, status, property_title, unit_number, tenant_name,
+     amount, late_fee, total_amount) = invoice_fields(invoice)
+    document = PDFDocument(title=f"Invoice {invoice_number}")
+
+    # Header
+    document.heading(f"INVOICE #{invoice_number}").spacer()
+
+    # Company Info
+    document.heading("Rental Management System", 2).spacer()
+
+    # Invoice Details
+    document.table([
+        ["Issue Date:", issue_date],
+        ["Due Date:", due_date],
+        ["Status:", status],
+        ["Property:", property_title],
+        ["Unit:", unit_number],
+        ["Tenant:", tenant_name],
+    ], 'details', (2, 4)).spacer()
+
+    # Amount Details
+    amount_data = [
+        ["Description", "Amount"],
+        ["Amount", f"₹{amount}"],
+    ]
+    if late_fee > 0:
+        amount_data.append(["Late Fee", f"₹{late_fee}"])
+    amount_data.append(["Total Amount", f"₹{total_amount}"])
+    document.table(amount_data, 'amounts', (3, 3))
+    return document
+
+
+def lease_document(lease):
+    (property_title, address, unit_number, start_date, end_date, monthly_rent, security_deposit,
+     owner_name, tenant_name) = lease_fields(lease)
+    document = PDFDocument(title="Lease Agreement")
+
+    # Header
+    document.heading("LEASE AGREEMENT").spacer()
+
+    # Property Details
+    document.heading("Property Information", 2)
+    document.table([
+        ["Property Name:", property_title],
+        ["Address:", address],
+        ["Unit:", unit_number],
+    ], 'details', (2, 4)).spacer()
+
+    # Lease Terms
+    document.heading("Lease Terms", 2)
+    document.table([
+        ["Start Date:", start_date],
+        ["End Date:", end_date],
+        ["Monthly Rent:", f"₹{monthly_rent}"],
+        ["Security Deposit:", f"₹{security_deposit}"],
+    ], 'details', (2, 4)).spacer()
+
+    # Signatures
+    document.heading("Signatures", 2).spacer(40)
+    document.table([
+        ["_________________________", "_________________________"],
+        ["Property Owner", "Tenant"],
+        [owner_name, tenant_name],
+        ["Date: ________________", "Date: ________________"],
+    ], 'signatures', (3, 3))
+    return document
+
+
+DOCUMENTS = {
+    'invoice': (invoice_fields, invoice_document),
+    'lease': (lease_fields, lease_document),
+}
+
+
+def document_fingerprint(kind, obj):
+    """Hash of the document layout version and every value printed on the document"""
+    fields, _ = DOCUMENTS[kind]
+    payload = '\x1f'.join(str(value) for value in [kind, DOCUMENT_VERSION] + fields(obj))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_document_path(kind, obj):
+    """
+    Path of the ``kind`` ('invoice' or 'lease') PDF for ``obj``, rendering it
+    into the cache first if this exact content isn't there yet. Files are named
+    after the content hash, so any change to a printed value (the invoice or
+    lease, or a related name or title) misses the cache and writes a new file,
+    and older copies for the same object are removed.
+    """
+    path = _cache_path(kind, obj)
+    if os.path.exists(path):
+        return path
+
+    _, build = DOCUMENTS[kind]
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary name and rename, so readers never see a partial file
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as temp_file:
+        build(obj).write(temp_file)
+    os.replace(temp_path, path)
+
+    discard_cached_documents(kind, obj.pk, keep=path)
+    return path
+
+
+def find_cached_document(kind, obj):
+    """Path of the cached PDF for ``obj``'s current content, or None if it hasn't been rendered"""
+    path = _cache_path(kind, obj)
+    return path if os.path.exists(path) else None
+
+
+def document_objects(kind):
+    """Queryset of ``kind`` documents with everything they print loaded"""
+    if kind == 'invoice':
+        return Invoice.objects.select_related(
+            'property__owner__user', 'tenant__user', 'lease_agreement__property_unit'
+        )
+    return LeaseAgreement.objects.select_related('property__owner__user', 'tenant__user', 'property_unit')
+
+
+def document_filename(kind, obj):
+    if kind == 'invoice':
+        return f"invoice_{obj.invoice_number}.pdf"
+    return f"lease_agreement_{obj.id}.pdf"
+
+
+def _cache_path(kind, obj):
+    return os.path.join(settings.DOCUMENT_CACHE_DIR, kind, f'{obj.pk}-{document_fingerprint(kind, obj)}.pdf')
+
+
+def discard_cached_documents(kind, pk, keep=None):
+    """Remove cached PDFs of ``kind`` for object ``pk`` (except ``keep``)"""
+    directory = os.path.join(settings.DOCUMENT_CACHE_DIR, kind)
+    prefix = f'{pk}-'
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and name.endswith('.pdf') and path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def render_documents(kind, objects, workers=1):
+    """
+    Yield ``(obj, path)`` for each of ``objects`` in order, like
+    ``cached_document_path``. Cache misses are rendered across a pool of
+    ``workers`` processes while earlier results are already being consumed.
+    ``objects`` must have every printed relation loaded (``select_related``):
+    they are pickled to the workers, which never query the database.
+    Only use ``workers`` > 1 from a management command: the pool forks the
+    current process and closes its database connections, which is unsafe in
+    a (possibly threaded) web worker.
+    """
+    objects = list(objects)
+    missing = [obj for obj in objects if find_cached_document(kind, obj) is None]
+    if workers <= 1 or len(missing) <= 1:
+        for obj in objects:
+            yield obj, cached_document_path(kind, obj)
+        return
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+    missing_ids = {id(obj) for obj in missing}
+    with ProcessPoolExecutor(max_workers=min(workers, len(missing)), initializer=django.setup) as pool:
+        rendered = pool.map(cached_document_path, [kind] * len(missing), missing)
+        for obj in objects:
+            yield obj, next(rendered) if id(obj) in missing_ids else cached_document_path(kind, obj)
+
+
+class _ZipStream:
+    """Write-only file object that hands out whatever zipfile has written so far"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries, chunk_size=64 * 1024):
+    """
+    Yield a ZIP archive of ``entries`` (``(archive_name, path)`` pairs) chunk
+    by chunk. The stream isn't seekable, so zipfile writes each file's sizes
+    after its data; no more than one chunk of the archive is held in memory.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in entries:
+            with open(path, 'rb') as source, archive.open(name, 'w') as target:
+                while True:
+                    block = source.read(chunk_size)
+                    if not block:
+                        break
+                    target.write(block)
+                    data = stream.drain()
+                    if data:
+                        yield data
+            data = stream.drain()
+            if data:
+                yield data
+    yield stream.drain()
+
+
+def month_invoices(property_id, month):
+    """Invoices of a property due in the month starting on date ``month``, ready to render"""
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return Invoice.objects.filter(
+        property_id=property_id,
+        due_date__gte=month,
+        due_date__lt=next_month
+    ).select_related(
+        'property', 'tenant__user', 'lease_agreement__property_unit'
+    ).order_by('due_date', 'invoice_number')
+
+
+def export_invoices_zip(invoices, workers=1):
+    """
+    Stream a ZIP of the PDFs of ``invoices``. Cache misses are rendered in
+    this process unless ``workers`` > 1 spreads them across a process pool,
+    which only the export_invoices command does.
+    """
+    return stream_zip(
+        (document_filename('invoice', invoice), path)
+        for invoice, path in render_documents('invoice', invoices, workers)
+    )
@@ -0,0 +1,322 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.db import connection, connections, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from payments.models import Invoice
+from payments.utils import InvoiceNumberAllocator
+from .models import LeaseAgreement, RentScheduleEntry, InvoiceRunCheckpoint
+from .analytics import schedule_stats_refresh
+from .utils import queue_invoice_notifications
+
+BATCH_SIZE = 1000
+
+
+class QueryCounter:
+    """Count the SQL statements executed on the default connection while active"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+
+def materialize_rent_schedules(leases=None, batch_size=BATCH_SIZE):
+    """
+    Backfill schedule entries for active leases saved before the schedule existed
+    (or written with ``bulk_create``/``update``, which skip ``LeaseAgreement.save``).
+    Returns the number of entries inserted.
+    """
+    if leases is None:
+        leases = LeaseAgreement.objects.filter(status='active')
+    leases = leases.only('id', 'start_date', 'end_date', 'rent_due_day', 'monthly_rent')
+
+    # bulk_create can't report which rows ignore_conflicts skipped, so count around it
+    before = RentScheduleEntry.objects.count()
+    batch = []
+    for lease in leases.iterator(chunk_size=batch_size):
+        batch.extend(lease.build_rent_schedule())
+        if len(batch) >= batch_size:
+            RentScheduleEntry.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+            batch = []
+    if batch:
+        RentScheduleEntry.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+    return RentScheduleEntry.objects.count() - before
+
+
+def unscheduled_leases():
+    """
+    Active leases without a scheduled or invoiced entry: activated through
+    ``QuerySet.update()``, which skips ``LeaseAgreement.save``
+    """
+    live = RentScheduleEntry.objects.filter(lease=OuterRef('pk'), status__in=['scheduled', 'invoiced'])
+    return LeaseAgreement.objects.filter(status='active').filter(~Exists(live))
+
+
+def schedule_unscheduled_leases(batch_size=BATCH_SIZE):
+    """
+    Materialize the schedule of every lease in ``unscheduled_leases``, first
+    dropping entries cancelled while it was inactive. Returns the number of
+    entries inserted.
+    """
+    # Read the ids first: MySQL won't delete from a table its subquery also reads
+    lease_ids = list(unscheduled_leases().values_list('id', flat=True))
+    if not lease_ids:
+        return 0
+    RentScheduleEntry.objects.filter(lease_id__in=lease_ids, status='cancelled').delete()
+    return materialize_rent_schedules(LeaseAgreement.objects.filter(id__in=lease_ids), batch_size)
+
+
+def matching_rent_invoice():
+    """Rent invoices for the lease and due date of the outer schedule entry"""
+    return Invoice.objects.filter(
+        lease_agreement=OuterRef('lease'),
+        due_date=OuterRef('due_date'),
+        payment_type='rent'
+    )
+
+
+def due_schedule_entries(due_from, due_to=None, property_range=None):
+    """
+    Scheduled rent for active, unit-linked leases due between ``due_from`` and
+    ``due_to`` inclusive (just ``due_from`` when ``due_to`` is omitted),
+    optionally limited to an inclusive ``(first, last)`` property id range.
+    Served by the (due_date, status) index rather than a scan over every lease.
+    """
+    entries = RentScheduleEntry.objects.filter(
+        due_date__range=(due_from, due_to or due_from),
+        status='scheduled',
+        lease__status='active',
+        lease__property_unit__isnull=False,
+    )
+    if property_range:
+        entries = entries.filter(lease__property__id__range=property_range)
+    return entries
+
+
+def link_invoices(entries):
+    """Point schedule entries at their rent invoice and mark them invoiced"""
+    invoice = matching_rent_invoice()
+    return entries.filter(Exists(invoice)).update(
+        invoice=Subquery(invoice.values('pk')[:1]),
+        status='invoiced'
+    )
+
+
+def build_rent_invoice(entry, invoice_number):
+    """Build (but don't save) the rent invoice for a schedule entry row"""
+    return Invoice(
+        lease_agreement_id=entry['lease_id'],
+        property_id=entry['lease__property_id'],
+        property_unit_id=entry['lease__property_unit_id'],
+        tenant_id=entry['lease__tenant_id'],
+        bank_account_id=entry['lease__bank_account_id'],
+        invoice_number=invoice_number,
+        amount=entry['amount'],
+        payment_type='rent',
+        description=f"Monthly rent for {entry['due_date'].strftime('%B %Y')}",
+        due_date=entry['due_date'],
+        total_amount=entry['amount'],
+    )
+
+
+def generate_rent_invoices(due_from, due_to=None, batch_size=BATCH_SIZE, property_range=None, numbers=None,
+                           notify=False):
+    """
+    Create the missing rent invoices for every schedule entry due between
+    ``due_from`` and ``due_to``. Entries that already have their invoice are
+    only linked, so any window can be re-run or backfilled safely.
+    Invoices are written with chunked ``bulk_create``, one transaction per chunk,
+    and the entries are linked to them in the same transaction. Invoice numbers
+    come from ``numbers`` (an ``InvoiceNumberAllocator``), one block per chunk.
+    With ``notify``, each chunk's invoice emails are queued in the outbox in
+    the same transaction, for run_mail_worker to send in batches.
+    Returns a dict of run statistics.
+    """
+    started = time.monotonic()
+    created = 0
+    numbers = numbers or InvoiceNumberAllocator()
+
+    with QueryCounter() as queries:
+        entries = due_schedule_entries(due_from, due_to, property_range)
+
+        # Invoices raised by hand (or by an earlier run) only need linking
+        link_invoices(entries)
+
+        rows = entries.order_by('pk').values(
+            'id', 'lease_id', 'lease__property_id', 'lease__property_unit_id',
+            'lease__tenant_id', 'lease__bank_account_id', 'amount', 'due_date'
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                created += _write_batch(batch, batch_size, numbers, notify)
+                batch = []
+        if batch:
+            created += _write_batch(batch, batch_size, numbers, notify)
+
+    elapsed = time.monotonic() - started
+    return {
+        'due_from': due_from,
+        'due_to': due_to or due_from,
+        'created': created,
+        'queries': queries.count,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(created / elapsed, 1) if elapsed > 0 else 0,
+    }
+
+
+def plan_partitions(due_from, due_to, workers):
+    """
+    Split the properties with rent due in the window into at most ``workers``
+    contiguous id ranges holding roughly the same number of due entries.
+    """
+    counts = list(
+        due_schedule_entries(due_from, due_to)
+        .values_list('lease__property_id')
+        .annotate(entries=Count('id'))
+        .order_by('lease__property_id')
+    )
+    target = sum(entries for _, entries in counts) / max(workers, 1)
+
+    ranges = []
+    first, filled = None, 0
+    for property_id, entries in counts:
+        if first is None:
+            first = property_id
+        filled += entries
+        if filled >= target and len(ranges) < workers - 1:
+            ranges.append((first, property_id))
+            first, filled = None, 0
+    if first is not None:
+        ranges.append((first, counts[-1][0]))
+    return ranges
+
+
+def prepare_checkpoints(due_from, due_to, workers):
+    """
+    Checkpoints still to run for the window: the unfinished partitions of an
+    interrupted run if there are any, otherwise a fresh plan over what is due.
+    """
+    checkpoints = InvoiceRunCheckpoint.objects.filter(due_from=due_from, due_to=due_to)
+    unfinished = list(checkpoints.exclude(status='completed'))
+    if unfinished:
+        return unfinished
+
+    last = checkpoints.order_by('-partition').values_list('partition', flat=True).first() or 0
+    InvoiceRunCheckpoint.objects.bulk_create([
+        InvoiceRunCheckpoint(
+            due_from=due_from,
+            due_to=due_to,
+            partition=last + number,
+            property_from=first,
+            property_to=last_property
+        )
+        for number, (first, last_property) in enumerate(plan_partitions(due_from, due_to, workers), start=1)
+    ])
+    # Re-read rather than trust bulk_create to have set primary keys (it doesn't on MySQL)
+    return list(checkpoints.filter(partition__gt=last))
+
+
+def run_partition(checkpoint_id, batch_size=BATCH_SIZE, notify=False):
+    """
+    Generate the invoices for one checkpointed partition. The invoices and the
+    completed checkpoint commit together, so a crash leaves the partition to rerun.
+    """
+    checkpoint = InvoiceRunCheckpoint.objects.get(pk=checkpoint_id)
+    property_range = (checkpoint.property_from, checkpoint.property_to)
+
+    # Reserve the partition's invoice numbers up front: allocating inside the
+    # partition transaction would hold the sequence row lock until it commits.
+    # Entries whose invoice already exists are only linked, so they take none
+    # (reserving for them would leave gaps in the sequence on every rerun)
+    numbers = InvoiceNumberAllocator()
+    numbers.reserve(
+        due_schedule_entries(checkpoint.due_from, checkpoint.due_to, property_range)
+        .filter(~Exists(matching_rent_invoice())).count()
+    )
+
+    with transaction.atomic():
+        checkpoint = InvoiceRunCheckpoint.objects.select_for_update().get(pk=checkpoint_id)
+        if checkpoint.status == 'completed':
+            return None
+
+        stats = generate_rent_invoices(
+            checkpoint.due_from,
+            checkpoint.due_to,
+            batch_size=batch_size,
+            property_range=property_range,
+            numbers=numbers,
+            notify=notify
+        )
+        checkpoint.status = 'completed'
+        checkpoint.invoices_created = stats['created']
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['status', 'invoices_created', 'completed_at'])
+    return stats
+
+
+def generate_rent_invoices_parallel(due_from, due_to, workers, batch_size=BATCH_SIZE, notify=False):
+    """
+    Run ``generate_rent_invoices`` for the window across a pool of ``workers``
+    processes, one property id range each. Re-running after a crash resumes
+    with the partitions that had not committed.
+    Returns a dict of run statistics.
+    """
+    started = time.monotonic()
+    due_to = due_to or due_from
+    checkpoint_ids = [checkpoint.pk for checkpoint in prepare_checkpoints(due_from, due_to, workers)]
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+
+    created = queries = 0
+    if checkpoint_ids:
+        with ProcessPoolExecutor(max_workers=min(workers, len(checkpoint_ids)), initializer=django.setup) as pool:
+            for stats in pool.map(run_partition, checkpoint_ids, repeat(batch_size), repeat(notify)):
+                if stats:
+                    created += stats['created']
+                    queries += stats['queries']
+
+    elapsed = time.monotonic() - started
+    return {
+        'due_from': due_from,
+        'due_to': due_to,
+        'created': created,
+        'partitions': len(checkpoint_ids),
+        'queries': queries,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(created / elapsed, 1) if elapsed > 0 else 0,
+    }
+
+
+def _write_batch(rows, batch_size, numbers, notify=False):
+    invoice_numbers = numbers.take(len(rows))
+    with transaction.atomic():
+        Invoice.objects.bulk_create(
+            [build_rent_invoice(row, number) for row, number in zip(rows, invoice_numbers)],
+            batch_size=batch_size
+        )
+        link_invoices(RentScheduleEntry.objects.filter(id__in=[row['id'] for row in rows]))
+        # bulk_create skips Invoice.save, so refresh the rollup months here
+        schedule_stats_refresh((row['lease__property_id'], row['due_date']) for row in rows)
+        if notify:
+            queue_invoice_notifications(
+                Invoice.objects.filter(invoice_number__in=invoice_numbers).select_related('property', 'tenant__user')
+            )
+    return len(rows)
@@ -0,0 +1,146 @@
+import json
+import platform
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import PropertyOwner
+from notifications.models import Notification
+from payments.models import Invoice
+from properties.documents import cached_document_path, document_objects
+from properties.invoicing import QueryCounter, generate_rent_invoices
+from properties.models import Property, PropertyUnit, LeaseAgreement, RentScheduleEntry
+
+class Command(BaseCommand):
+    help = 'Time rent invoice generation, dashboard rendering and invoice exports, and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark_results.json', help='File the JSON results are written to')
+        parser.add_argument('--owner', help='Username of the property owner whose pages are rendered '
+                                            '(defaults to the owner with the most properties)')
+        parser.add_argument('--window-days', type=int, default=30,
+                            help='Generate invoices for rent due within this many days of today')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is reported')
+
+    def handle(self, *args, **options):
+        owner = self._get_owner(options['owner'])
+        today = timezone.now().date()
+        results = {
+            'generated_at': timezone.now(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': {
+                'properties': Property.objects.count(),
+                'units': PropertyUnit.objects.count(),
+                'leases': LeaseAgreement.objects.count(),
+                'rent_schedule_entries': RentScheduleEntry.objects.count(),
+                'invoices': Invoice.objects.count(),
+                'notifications': Notification.objects.count(),
+            },
+            'owner': owner.user.username,
+            'invoice_generation': self._time_invoice_generation(
+                today, today + timedelta(days=options['window_days']), options['repeat']
+            ),
+            'pages': {},
+        }
+
+        client = Client()
+        client.force_login(owner.user)
+        pages = {
+            'dashboard': reverse('accounts:dashboard'),
+            'property_analytics': reverse('accounts:property_analytics'),
+            'notification_list': reverse('notifications:notification_list'),
+        }
+        for name, url in pages.items():
+            results['pages'][name] = self._time_request(client, url, options['repeat'])
+
+        # Downloads only serve cached PDFs (a miss queues a job for run_document_worker), so
+        # time the render itself and the month's ZIP export, each against an empty cache
+        invoice = document_objects('invoice').filter(property__owner=owner).order_by('-pk').first()
+        if invoice:
+            results['invoice_pdf_render'] = self._time_document_render(invoice, options['repeat'])
+            export_url = reverse('properties:export_invoices', args=[invoice.property_id])
+            results['pages']['invoice_zip_export'] = self._time_request(
+                client, f"{export_url}?month={invoice.due_date.strftime('%Y-%m')}", options['repeat'], cold_documents=True
+            )
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, cls=DjangoJSONEncoder, indent=2)
+
+        timings = [('invoice_generation', results['invoice_generation'])]
+        if 'invoice_pdf_render' in results:
+            timings.append(('invoice_pdf_render', results['invoice_pdf_render']))
+        for name, timing in timings + list(results['pages'].items()):
+            self.stdout.write(f"{name}: {timing['seconds']}s, {timing['queries']} queries")
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+
+    def _get_owner(self, username):
+        if username:
+            try:
+                return PropertyOwner.objects.select_related('user').get(user__username=username)
+            except PropertyOwner.DoesNotExist:
+                raise CommandError(f'No property owner with username "{username}"')
+        owner = (PropertyOwner.objects.select_related('user')
+                 .annotate(property_count=Count('property')).order_by('-property_count').first())
+        if owner is None:
+            raise CommandError('No property owners to benchmark; run seed_portfolio first')
+        return owner
+
+    def _time_invoice_generation(self, due_from, due_to, repeat):
+        # Every run is rolled back so each one starts from the same rent schedule
+        best = None
+        for _ in range(repeat):
+            with transaction.atomic():
+                stats = generate_rent_invoices(due_from, due_to)
+                transaction.set_rollback(True)
+            if best is None or stats['seconds'] < best['seconds']:
+                best = stats
+        return best
+
+    @contextmanager
+    def _empty_document_cache(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(DOCUMENT_CACHE_DIR=directory):
+            yield
+
+    def _time_document_render(self, invoice, repeat):
+        best = None
+        for _ in range(repeat):
+            with self._empty_document_cache():
+                started = time.monotonic()
+                with QueryCounter() as queries:
+                    with open(cached_document_path('invoice', invoice), 'rb') as document:
+                        size = len(document.read())
+                elapsed = time.monotonic() - started
+            if best is None or elapsed < best['seconds']:
+                best = {'invoice': invoice.invoice_number, 'bytes': size, 'seconds': round(elapsed, 4),
+                        'queries': queries.count}
+        return best
+
+    def _time_request(self, client, url, repeat, cold_documents=False):
+        best = None
+        for _ in range(repeat):
+            with self._empty_document_cache() if cold_documents else nullcontext():
+                started = time.monotonic()
+                with QueryCounter() as queries:
+                    response = client.get(url, secure=True, HTTP_HOST='localhost')
+                    # Streaming responses (exports) are only finished once consumed
+                    content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.monotonic() - started
+            if best is None or elapsed < best['seconds']:
+                best = {
+                    'url': url,
+                    'status_code': response.status_code,
+                    'bytes': len(content),
+                    'seconds': round(elapsed, 4),
+                    'queries': queries.count,
+                }
+        return best
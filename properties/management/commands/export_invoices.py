@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.documents import export_invoices_zip, month_invoices
+from properties.models import Property
+
+
+def parse_month(value):
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+class Command(BaseCommand):
+    help = 'Write the PDFs of every invoice of a property due in a month to one ZIP file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', dest='property_id', type=int, required=True,
+                            help='Property id')
+        parser.add_argument('--month', type=parse_month, required=True,
+                            help='Month the invoices are due in (YYYY-MM)')
+        parser.add_argument('--output',
+                            help='ZIP file to write (defaults to invoices_<property>_<month>.zip)')
+        parser.add_argument('--workers', type=int,
+                            help='Processes rendering uncached PDFs (defaults to DOCUMENT_EXPORT_WORKERS)')
+
+    def handle(self, *args, **options):
+        if not Property.objects.filter(pk=options['property_id']).exists():
+            raise CommandError(f"Property {options['property_id']} does not exist")
+
+        month = options['month']
+        invoices = month_invoices(options['property_id'], month)
+        count = invoices.count()
+        if not count:
+            raise CommandError(f"No invoices are due in {month.strftime('%B %Y')}")
+
+        output = options['output'] or f"invoices_{options['property_id']}_{month.strftime('%Y-%m')}.zip"
+        size = 0
+        with open(output, 'wb') as archive:
+            for chunk in export_invoices_zip(invoices, workers=options['workers'] or settings.DOCUMENT_EXPORT_WORKERS):
+                archive.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} invoices ({size} bytes) to {output}"))
@@ -1,60 +1,66 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.utils import timezone
-from datetime import timedelta
-from properties.models import LeaseAgreement, Invoice
-from django.db.models import Q
-import uuid
+from datetime import date, timedelta
+from properties.invoicing import (
+    generate_rent_invoices, generate_rent_invoices_parallel, schedule_unscheduled_leases, BATCH_SIZE
+)
 
 class Command(BaseCommand):
     help = 'Generate rent invoices for leases with upcoming due dates'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=5,
+                            help='Generate invoices for rent due this many days from today')
+        parser.add_argument('--from', dest='due_from', type=date.fromisoformat,
+                            help='Catch up on every missing invoice due from this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='due_to', type=date.fromisoformat,
+                            help='Last due date to catch up on (defaults to today + --days)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of invoices written per bulk insert')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Split the run by property id range across this many processes')
+        parser.add_argument('--notify', action='store_true',
+                            help='Queue an invoice email to each tenant (sent in batches by run_mail_worker)')
+
     def handle(self, *args, **options):
-        # Get current date
+        # Rent due N days from now, or the whole --from/--to window when catching up
         today = timezone.now().date()
-        # Get date 5 days from now
-        five_days_from_now = today + timedelta(days=5)
-        
-        # Find active leases where rent is due in 5 days
-        leases = LeaseAgreement.objects.filter(
-            Q(status='active') &
-            Q(end_date__gte=today)
-        )
+        horizon = today + timedelta(days=options['days'])
+
+        if options['due_from']:
+            due_from = options['due_from']
+            due_to = options['due_to'] or horizon
+        elif options['due_to']:
+            raise CommandError('--to requires --from')
+        else:
+            due_from = due_to = horizon
+
+        if due_from > due_to:
+            raise CommandError('--from must not be after --to')
 
-        invoices_created = 0
-        for lease in leases:
-            # Calculate next rent due date
-            next_due = lease.next_payment_date()
-            
-            # Check if this is 5 days before the due date
-            if next_due == five_days_from_now:
-                # Check if invoice doesn't already exist
-                if not Invoice.objects.filter(
-                    lease_agreement=lease,
-                    due_date=next_due,
-                    payment_type='rent'
-                ).exists():
-                    # Create invoice
-                    invoice = Invoice.objects.create(
-                        lease_agreement=lease,
-                        property=lease.property,
-                        tenant=lease.tenant,
-                        invoice_number=f"RENT-{uuid.uuid4().hex[:8].upper()}",
-                        amount=lease.monthly_rent,
-                        payment_type='rent',
-                        description=f"Monthly rent for {next_due.strftime('%B %Y')}",
-                        due_date=next_due,
-                        total_amount=lease.monthly_rent,
-                        bank_account=lease.bank_account
-                    )
-                    invoices_created += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Created invoice {invoice.invoice_number} for lease {lease.id} - Due: {next_due}'
-                        )
-                    )
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            # SQLite allows one writer at a time, so the partitions would fail
+            # with "database is locked" and leave their checkpoints pending
+            raise CommandError('--workers needs a database with concurrent writers (e.g. MySQL); '
+                               'run with --workers 1 on SQLite')
 
+        # Leases activated with QuerySet.update() have no schedule to invoice from yet
+        scheduled = schedule_unscheduled_leases(options['batch_size'])
+        if scheduled:
+            self.stdout.write(f'Scheduled {scheduled} rent entries for leases activated without save()')
+
+        if options['workers'] > 1:
+            stats = generate_rent_invoices_parallel(
+                due_from, due_to, options['workers'], batch_size=options['batch_size'], notify=options['notify']
+            )
+        else:
+            stats = generate_rent_invoices(due_from, due_to, batch_size=options['batch_size'], notify=options['notify'])
+
+        window = stats['due_from'] if due_from == due_to else f"{stats['due_from']} to {stats['due_to']}"
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {invoices_created} invoices'
+                f"Successfully created {stats['created']} invoices due {window} "
+                f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec, {stats['queries']} queries)"
             )
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from properties.invoicing import materialize_rent_schedules, BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Backfill rent schedule entries for active lease agreements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of schedule entries written per bulk insert')
+
+    def handle(self, *args, **options):
+        created = materialize_rent_schedules(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} rent schedule entries'))
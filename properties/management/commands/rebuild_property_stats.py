@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.analytics import rebuild_monthly_stats, roll_forward_monthly_stats, REBUILD_BATCH_SIZE
+
+
+def parse_month(value):
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly property rollup (PropertyMonthlyStats) from invoices, leases and units'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', dest='property_ids', type=int, action='append',
+                            help='Only rebuild this property (repeatable)')
+        parser.add_argument('--from', dest='start', type=parse_month,
+                            help='First month to rebuild (YYYY-MM, defaults to the earliest invoice or lease)')
+        parser.add_argument('--to', dest='end', type=parse_month,
+                            help='Last month to rebuild (YYYY-MM, defaults to the current month)')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help='Number of properties refreshed per batch')
+        parser.add_argument('--current', action='store_true',
+                            help='Only refresh the current month of every property; schedule this daily '
+                                 'so properties without invoice or lease activity still get a row each month')
+
+    def handle(self, *args, **options):
+        if options['current']:
+            if options['property_ids'] or options['start'] or options['end']:
+                raise CommandError('--current refreshes every property for the current month; '
+                                   'it cannot be combined with --property, --from or --to')
+            written = roll_forward_monthly_stats(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} monthly property stats rows for the current month'))
+            return
+
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--from must not be after --to')
+
+        written = rebuild_monthly_stats(
+            options['property_ids'], options['start'], options['end'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} monthly property stats rows'))
@@ -0,0 +1,17 @@
+from properties.document_jobs import process_document_jobs, BATCH_SIZE
+from utils.queue import QueueWorkerCommand
+
+class Command(QueueWorkerCommand):
+    help = 'Render queued invoice and lease PDFs for download'
+    item_name = 'jobs'
+    batch_size = BATCH_SIZE
+    sleep = 1
+
+    def process_batch(self, batch_size):
+        return process_document_jobs(batch_size)
+
+    def batch_message(self, done, failed):
+        return f'Rendered {done} documents, {failed} failed'
+
+    def summary_message(self, done, failed):
+        return f'Document worker rendered {done} documents ({failed} failures)'
@@ -0,0 +1,163 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import CustomUser, PropertyOwner, Tenant
+from notifications.models import Notification
+from payments.models import Invoice
+from payments.utils import InvoiceNumberAllocator
+from properties.analytics import rebuild_monthly_stats
+from properties.invoicing import build_rent_invoice, link_invoices, materialize_rent_schedules
+from properties.models import Property, PropertyUnit, LeaseAgreement, TenantProperty, RentScheduleEntry
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic portfolio (owners, properties, units, tenants, leases, invoices, notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=10)
+        parser.add_argument('--properties', type=int, default=5, help='Properties per owner')
+        parser.add_argument('--units', type=int, default=10, help='Units per property')
+        parser.add_argument('--occupancy', type=float, default=0.9, help='Share of units with an active lease')
+        parser.add_argument('--invoice-months', type=int, default=6, help='Months of past rent invoices per lease')
+        parser.add_argument('--notifications', type=int, default=20, help='Notifications per user')
+        parser.add_argument('--password', default='password', help='Password for every generated user')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible portfolio')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+        today = timezone.now().date()
+        tag = timezone.now().strftime('%Y%m%d%H%M%S')
+        password = make_password(options['password'])
+
+        # Owners
+        owner_user_ids = self._bulk_insert(CustomUser, [
+            CustomUser(username=f'seed-{tag}-owner-{i}', email=f'seed-{tag}-owner-{i}@example.com',
+                       first_name='Owner', last_name=str(i), user_type='property_owner', password=password)
+            for i in range(options['owners'])
+        ])
+        owner_ids = self._bulk_insert(PropertyOwner, [
+            PropertyOwner(user_id=user_id, company_name=f'Seed Holdings {i}', verification_status=True)
+            for i, user_id in enumerate(owner_user_ids)
+        ])
+
+        # Properties and units
+        property_ids = self._bulk_insert(Property, [
+            Property(owner_id=owner_id, title=f'Seed Property {owner_id}-{i}',
+                     property_type=rng.choice(['residential', 'commercial']),
+                     address=f'{i} Seed Street', city=rng.choice(['Chennai', 'Bengaluru', 'Mumbai', 'Pune']),
+                     state='Seed State', postal_code='600001', is_occupied=True)
+            for owner_id in owner_ids for i in range(options['properties'])
+        ])
+        units = [
+            PropertyUnit(property_id=property_id, unit_number=f'U{i + 1}',
+                         monthly_rent=Decimal(rng.randrange(8000, 60000, 500)),
+                         bedrooms=rng.randint(1, 4), bathrooms=rng.randint(1, 3),
+                         square_feet=rng.randrange(400, 2500, 50),
+                         is_available=rng.random() >= options['occupancy'])
+            for property_id in property_ids for i in range(options['units'])
+        ]
+        unit_ids = self._bulk_insert(PropertyUnit, units)
+        occupied = [(unit_id, unit) for unit_id, unit in zip(unit_ids, units) if not unit.is_available]
+
+        # One tenant and one active lease per occupied unit
+        tenant_user_ids = self._bulk_insert(CustomUser, [
+            CustomUser(username=f'seed-{tag}-tenant-{i}', email=f'seed-{tag}-tenant-{i}@example.com',
+                       first_name='Tenant', last_name=str(i), user_type='tenant', password=password)
+            for i in range(len(occupied))
+        ])
+        tenant_ids = self._bulk_insert(Tenant, [
+            Tenant(user_id=user_id, emergency_contact='0000000000') for user_id in tenant_user_ids
+        ])
+
+        leases = []
+        for tenant_id, (unit_id, unit) in zip(tenant_ids, occupied):
+            start_date = today - timedelta(days=rng.randint(0, 330))
+            leases.append(LeaseAgreement(
+                property_id=unit.property_id, property_unit_id=unit_id, tenant_id=tenant_id,
+                start_date=start_date, end_date=start_date + timedelta(days=365),
+                monthly_rent=unit.monthly_rent, security_deposit=unit.monthly_rent * 2,
+                # Mostly early-month due days, with some 29-31 for short-month clamping
+                rent_due_day=rng.choice([1] * 10 + list(range(2, 32))),
+                status='active', terms_and_conditions='Synthetic lease generated by seed_portfolio',
+                signed_by_tenant=True, signed_by_owner=True
+            ))
+        lease_ids = self._bulk_insert(LeaseAgreement, leases)
+        TenantProperty.objects.bulk_create([
+            TenantProperty(tenant_id=lease.tenant_id, property_id=lease.property_id, status='active',
+                           start_date=timezone.now())
+            for lease in leases
+        ], batch_size=self.batch_size)
+
+        # Rent schedule, then invoices for the months already due
+        seeded_leases = LeaseAgreement.objects.none()
+        if lease_ids:
+            seeded_leases = LeaseAgreement.objects.filter(id__range=(lease_ids[0], lease_ids[-1]))
+        materialize_rent_schedules(seeded_leases, batch_size=self.batch_size)
+
+        past_due = RentScheduleEntry.objects.filter(
+            lease__in=seeded_leases,
+            due_date__lt=today,
+            due_date__gte=today - timedelta(days=31 * options['invoice_months'])
+        ).order_by('pk').values(
+            'id', 'lease_id', 'lease__property_id', 'lease__property_unit_id',
+            'lease__tenant_id', 'lease__bank_account_id', 'amount', 'due_date'
+        )
+        numbers = InvoiceNumberAllocator(prefix='SEED')
+        invoices = []
+        for row, number in zip(past_due, numbers.take(past_due.count())):
+            invoice = build_rent_invoice(row, number)
+            if rng.random() < 0.85:
+                invoice.status = 'paid'
+                invoice.payment_date = row['due_date'] + timedelta(days=rng.randint(-3, 10))
+            elif row['due_date'] < today - timedelta(days=15):
+                invoice.status = 'overdue'
+            invoices.append(invoice)
+        Invoice.objects.bulk_create(invoices, batch_size=self.batch_size)
+        link_invoices(RentScheduleEntry.objects.filter(lease__in=seeded_leases, due_date__lt=today))
+        # Bulk inserts skip the rollup hooks
+        rebuild_monthly_stats(property_ids)
+
+        # Notifications for every generated user
+        notification_types = [choice for choice, _ in Notification.NOTIFICATION_TYPES]
+        notification_count = 0
+        batch = []
+        for user_id in owner_user_ids + tenant_user_ids:
+            for i in range(options['notifications']):
+                batch.append(Notification(
+                    recipient_id=user_id, notification_type=rng.choice(notification_types),
+                    title=f'Seed notification {i}', message='Synthetic notification generated by seed_portfolio',
+                    is_read=rng.random() < 0.7
+                ))
+            if len(batch) >= self.batch_size:
+                Notification.objects.bulk_create(batch, batch_size=self.batch_size)
+                notification_count += len(batch)
+                batch = []
+        if batch:
+            Notification.objects.bulk_create(batch, batch_size=self.batch_size)
+            notification_count += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(owner_ids)} owners, {len(property_ids)} properties, {len(unit_ids)} units, '
+            f'{len(tenant_ids)} tenants, {len(lease_ids)} leases, {len(invoices)} invoices and '
+            f'{notification_count} notifications in {time.monotonic() - started:.1f}s '
+            f'(users are seed-{tag}-*)'
+        ))
+
+    def _bulk_insert(self, model, objects):
+        """
+        Insert ``objects`` and return their ids in insertion order. MySQL doesn't
+        return ids from bulk inserts, so read back everything above the previous
+        maximum id; run the seeder against a database nobody else is writing to.
+        """
+        last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
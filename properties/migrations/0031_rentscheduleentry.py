@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0015_alter_payment_stripe_payment_intent_id_and_more'),
+        ('properties', '0030_alter_propertyunit_kitchen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentScheduleEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the month this rent covers')),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('invoiced', 'Invoiced'), ('cancelled', 'Cancelled')], default='scheduled', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_entries', to='payments.invoice')),
+                ('lease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rent_schedule', to='properties.leaseagreement')),
+            ],
+            options={
+                'verbose_name_plural': 'Rent Schedule Entries',
+                'ordering': ['due_date'],
+                'indexes': [models.Index(fields=['due_date', 'status'], name='properties__due_dat_b21fad_idx')],
+                'unique_together': {('lease', 'period')},
+            },
+        ),
+    ]
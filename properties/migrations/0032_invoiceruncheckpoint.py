@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0031_rentscheduleentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceRunCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_from', models.DateField()),
+                ('due_to', models.DateField()),
+                ('partition', models.PositiveIntegerField()),
+                ('property_from', models.BigIntegerField(help_text='First property id in this partition')),
+                ('property_to', models.BigIntegerField(help_text='Last property id in this partition')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('invoices_created', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['due_from', 'partition'],
+                'unique_together': {('due_from', 'due_to', 'partition')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0034_documentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('billed', models.DecimalField(decimal_places=2, default=0, help_text='Invoices due this month, excluding cancelled', max_digits=12)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, help_text='Invoices paid this month', max_digits=12)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, help_text='Invoices due this month and still unpaid', max_digits=12)),
+                ('occupied_units', models.PositiveIntegerField(default=0)),
+                ('total_units', models.PositiveIntegerField(default=0)),
+                ('avg_rent', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='properties.property')),
+            ],
+            options={
+                'verbose_name_plural': 'Property Monthly Stats',
+                'ordering': ['month'],
+                'unique_together': {('property', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+import calendar
+from datetime import date
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def materialize_rent_schedules(apps, schema_editor):
+    """
+    Give leases that were active before the rent schedule existed their
+    schedule entries, since generate_rent_invoices only reads the schedule.
+    Mirrors LeaseAgreement.build_rent_schedule, which historical models don't
+    have. Months that were already invoiced are linked on the next run.
+    """
+    LeaseAgreement = apps.get_model('properties', 'LeaseAgreement')
+    RentScheduleEntry = apps.get_model('properties', 'RentScheduleEntry')
+
+    leases = LeaseAgreement.objects.filter(status='active').only(
+        'id', 'start_date', 'end_date', 'rent_due_day', 'monthly_rent'
+    )
+    batch = []
+    for lease in leases.iterator(chunk_size=BATCH_SIZE):
+        year, month = lease.start_date.year, lease.start_date.month
+        while (year, month) <= (lease.end_date.year, lease.end_date.month):
+            due_date = date(year, month, min(lease.rent_due_day, calendar.monthrange(year, month)[1]))
+            if lease.start_date <= due_date <= lease.end_date:
+                batch.append(RentScheduleEntry(
+                    lease_id=lease.id,
+                    period=due_date.replace(day=1),
+                    due_date=due_date,
+                    amount=lease.monthly_rent
+                ))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        if len(batch) >= BATCH_SIZE:
+            RentScheduleEntry.objects.bulk_create(batch, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            batch = []
+    if batch:
+        RentScheduleEntry.objects.bulk_create(batch, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0035_propertymonthlystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(materialize_rent_schedules, migrations.RunPython.noop),
+    ]
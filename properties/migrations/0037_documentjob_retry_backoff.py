@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:02
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0036_materialize_existing_rent_schedules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='documentjob',
+            name='properties__status_2c0582_idx',
+        ),
+        migrations.AddField(
+            model_name='documentjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='documentjob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='properties__status_b1336b_idx'),
+        ),
+    ]
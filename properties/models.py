@@ -5,10 +5,18 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.db import transaction
+from datetime import date
+import calendar
 import uuid
 
 # Create your models here.
 
+def rent_due_date(year, month, due_day):
+    """Due date for a month, clamped to the month's last day (e.g. day 31 in February)"""
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, min(due_day, last_day))
+
+
 class Property(models.Model):
     PROPERTY_TYPE_CHOICES = (
         ('residential', 'Residential'),
@@ -40,11 +48,18 @@ class Property(models.Model):
 
     @property
     def occupancy_rate(self):
-        """Calculate the occupancy rate based on units that are not available"""
-        total_units = self.units.count()
+        """
+        Calculate the occupancy rate based on units that are not available.
+        Uses the ``unit_count``/``occupied_unit_count`` annotations when the
+        queryset provides them instead of counting per property.
+        """
+        if hasattr(self, 'unit_count'):
+            total_units, occupied_units = self.unit_count, self.occupied_unit_count
+        else:
+            total_units = self.units.count()
+            occupied_units = self.units.filter(is_available=False).count() if total_units else 0
         if total_units == 0:
             return 0
-        occupied_units = self.units.filter(is_available=False).count()
         return round((occupied_units / total_units) * 100)
 
     def __str__(self):
@@ -72,6 +87,20 @@ class PropertyUnit(models.Model):
     def __str__(self):
         return f"{self.property.title} - {self.unit_number}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .analytics import schedule_stats_refresh, unit_stats_months
+            schedule_stats_refresh(unit_stats_months(self.property_id))
+
+    def delete(self, *args, **kwargs):
+        property_id = self.property_id
+        result = super().delete(*args, **kwargs)
+        from .analytics import schedule_stats_refresh, unit_stats_months
+        schedule_stats_refresh(unit_stats_months(property_id))
+        return result
+
 
 
 class PropertyImage(models.Model):
@@ -148,27 +177,254 @@ class LeaseAgreement(models.Model):
     property_unit = models.ForeignKey(PropertyUnit, on_delete=models.SET_NULL, null=True, blank=True, related_name='lease_agreements')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Changes to these fields move the rent schedule and the lease's months in the rollup
+    SCHEDULE_FIELDS = ('property', 'property_unit', 'start_date', 'end_date', 'rent_due_day', 'monthly_rent', 'status')
+
     def next_payment_date(self):
         """Calculate the next payment due date"""
         today = timezone.now().date()
-        current_month = today.replace(day=self.rent_due_day)
+        current_month = rent_due_date(today.year, today.month, self.rent_due_day)
 
         if today > current_month:
             # If we've passed the due day this month, payment is due next month
-            if current_month.month == 12:
-                next_payment = current_month.replace(year=current_month.year + 1, month=1)
+            if today.month == 12:
+                next_payment = rent_due_date(today.year + 1, 1, self.rent_due_day)
             else:
-                next_payment = current_month.replace(month=current_month.month + 1)
+                next_payment = rent_due_date(today.year, today.month + 1, self.rent_due_day)
         else:
             # If we haven't reached the due day yet, payment is due this month
             next_payment = current_month
 
         return next_payment
 
+    def build_rent_schedule(self):
+        """Unsaved schedule entries for every rent due date within the lease term"""
+        entries = []
+        year, month = self.start_date.year, self.start_date.month
+        while (year, month) <= (self.end_date.year, self.end_date.month):
+            due_date = rent_due_date(year, month, self.rent_due_day)
+            if self.start_date <= due_date <= self.end_date:
+                entries.append(RentScheduleEntry(
+                    lease=self,
+                    period=due_date.replace(day=1),
+                    due_date=due_date,
+                    amount=self.monthly_rent
+                ))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return entries
+
+    def materialize_rent_schedule(self):
+        """
+        Create the missing schedule entries for an active lease and bring the
+        not-yet-invoiced ones in line with the current term and rent.
+        Safe to call repeatedly, e.g. after a renewal extends ``end_date``.
+        """
+        with transaction.atomic():
+            expected = {entry.period: entry for entry in self.build_rent_schedule()}
+            existing = self.rent_schedule.values_list('id', 'period', 'due_date', 'amount', 'status')
+
+            # Invoiced entries are history; anything else that no longer matches is rebuilt
+            stale = []
+            for entry_id, period, due_date, amount, status in existing:
+                entry = expected.get(period)
+                if status == 'invoiced':
+                    expected.pop(period, None)
+                elif entry and status == 'scheduled' and (entry.due_date, entry.amount) == (due_date, amount):
+                    expected.pop(period)
+                else:
+                    stale.append(entry_id)
+
+            if stale:
+                RentScheduleEntry.objects.filter(id__in=stale).delete()
+            if expected:
+                RentScheduleEntry.objects.bulk_create(expected.values())
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule_values = instance._schedule_values()
+        return instance
+
+    def _schedule_values(self):
+        """Loaded values of SCHEDULE_FIELDS, or None if any of them is deferred"""
+        attnames = [self._meta.get_field(name).attname for name in self.SCHEDULE_FIELDS]
+        if any(attname not in self.__dict__ for attname in attnames):
+            return None
+        return {attname: self.__dict__[attname] for attname in attnames}
+
+    def save(self, *args, **kwargs):
+        """
+        Saves that change a SCHEDULE_FIELDS field bring the rent schedule in
+        line with the lease and refresh its months in the rollup. Leases
+        activated with ``QuerySet.update()`` skip this; generate_rent_invoices
+        schedules those before it invoices.
+        """
+        update_fields = kwargs.get('update_fields')
+        current = self._schedule_values()
+        loaded = getattr(self, '_loaded_schedule_values', None)
+        previous = None
+        if update_fields is not None and not set(update_fields) & set(self.SCHEDULE_FIELDS):
+            changed = False
+        elif self._state.adding or current is None:
+            changed = True
+        elif loaded is not None:
+            changed = current != loaded
+            previous = loaded
+        else:
+            # Built by hand rather than loaded: compare with the stored row
+            previous = LeaseAgreement.objects.filter(pk=self.pk).values(*current).first()
+            changed = current != previous
+
+        super().save(*args, **kwargs)
+        if not changed:
+            return
+        self._loaded_schedule_values = self._schedule_values()
+
+        # Keep the rent schedule in step with the lease status
+        if self.status == 'active':
+            self.materialize_rent_schedule()
+        else:
+            self.rent_schedule.filter(status='scheduled').update(status='cancelled')
+
+        from .analytics import schedule_stats_refresh
+        months = self.stats_months()
+        if previous:
+            months += self.stats_months(previous['property_id'], previous['start_date'], previous['end_date'])
+        schedule_stats_refresh(months)
+
+    def delete(self, *args, **kwargs):
+        months = self.stats_months()
+        result = super().delete(*args, **kwargs)
+        from .analytics import schedule_stats_refresh
+        schedule_stats_refresh(months)
+        return result
+
+    def stats_months(self, property_id=None, start_date=None, end_date=None):
+        """(property id, month) rollup rows whose occupancy and rent this lease affects"""
+        from .analytics import months_between
+        if property_id is None:
+            property_id, start_date, end_date = self.property_id, self.start_date, self.end_date
+        return [(property_id, month) for month in months_between(start_date, end_date)]
+
     def __str__(self):
         return f"Lease for {self.property.title} - {self.tenant.user.get_full_name()}"
 
 
+class RentScheduleEntry(models.Model):
+    STATUS_CHOICES = (
+        ('scheduled', 'Scheduled'),
+        ('invoiced', 'Invoiced'),
+        ('cancelled', 'Cancelled'),
+    )
+
+    lease = models.ForeignKey(LeaseAgreement, on_delete=models.CASCADE, related_name='rent_schedule')
+    period = models.DateField(help_text="First day of the month this rent covers")
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    invoice = models.ForeignKey('payments.Invoice', on_delete=models.SET_NULL, null=True, blank=True, related_name='schedule_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Rent Schedule Entries"
+        ordering = ['due_date']
+        unique_together = ['lease', 'period']
+        indexes = [
+            models.Index(fields=['due_date', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Rent due {self.due_date} - lease {self.lease_id}"
+
+
+class InvoiceRunCheckpoint(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('completed', 'Completed'),
+    )
+
+    due_from = models.DateField()
+    due_to = models.DateField()
+    partition = models.PositiveIntegerField()
+    property_from = models.BigIntegerField(help_text="First property id in this partition")
+    property_to = models.BigIntegerField(help_text="Last property id in this partition")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    invoices_created = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['due_from', 'partition']
+        unique_together = ['due_from', 'due_to', 'partition']
+
+    def __str__(self):
+        return f"Invoice run {self.due_from}..{self.due_to} #{self.partition} ({self.status})"
+
+
+class DocumentJob(models.Model):
+    KIND_CHOICES = (
+        ('invoice', 'Invoice'),
+        ('lease', 'Lease Agreement'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('rendering', 'Rendering'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    fingerprint = models.CharField(max_length=64, help_text="Content hash of the document when requested")
+    requested_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='document_jobs')
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file_path = models.CharField(max_length=500, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['kind', 'object_id', 'fingerprint']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} ({self.status})"
+
+
+class PropertyMonthlyStats(models.Model):
+    """
+    Per-property monthly rollup read by the analytics pages. Rows are
+    recomputed by the invoice, lease and unit save/delete hooks for the
+    months they touch, and in full by the rebuild_property_stats command.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='monthly_stats')
+    month = models.DateField(help_text="First day of the month")
+    billed = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Invoices due this month, excluding cancelled")
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Invoices paid this month")
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Invoices due this month and still unpaid")
+    occupied_units = models.PositiveIntegerField(default=0)
+    total_units = models.PositiveIntegerField(default=0)
+    avg_rent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Property Monthly Stats"
+        ordering = ['month']
+        unique_together = ['property', 'month']
+
+    def __str__(self):
+        return f"{self.property_id} {self.month:%Y-%m}"
+
+
 class TenantProperty(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -1,3 +1,559 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser, PropertyOwner, Tenant
+from payments.models import Invoice
+from .analytics import month_start, parse_series_params, portfolio_analytics, revenue_series
+from .document_jobs import MAX_ATTEMPTS, RETRY_DELAY, claim_jobs, process_document_jobs
+from .invoicing import generate_rent_invoices, prepare_checkpoints, run_partition, schedule_unscheduled_leases
+from payments.models import InvoiceNumberSequence
+from .models import (
+    DocumentJob, InvoiceRunCheckpoint, LeaseAgreement, Property, PropertyMonthlyStats, PropertyUnit, RentScheduleEntry, rent_due_date
+)
+
+
+class RentDueDateTests(TestCase):
+    def test_due_day_within_month(self):
+        self.assertEqual(rent_due_date(2025, 3, 15), date(2025, 3, 15))
+
+    def test_due_day_clamped_to_month_end(self):
+        self.assertEqual(rent_due_date(2025, 2, 31), date(2025, 2, 28))
+        self.assertEqual(rent_due_date(2025, 4, 31), date(2025, 4, 30))
+
+    def test_due_day_clamped_in_leap_year(self):
+        self.assertEqual(rent_due_date(2024, 2, 30), date(2024, 2, 29))
+
+
+class LeaseFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        owner_user = CustomUser.objects.create_user(username='owner', password='pass', user_type='property_owner')
+        tenant_user = CustomUser.objects.create_user(username='tenant', password='pass', user_type='tenant')
+        cls.owner = PropertyOwner.objects.create(user=owner_user)
+        cls.tenant = Tenant.objects.create(user=tenant_user, emergency_contact='555-0100')
+        cls.property = Property.objects.create(
+            owner=cls.owner, title='Elm Court', property_type='residential', address='1 Elm St',
+            city='Springfield', state='IL', postal_code='62701'
+        )
+        cls.unit = PropertyUnit.objects.create(
+            property=cls.property, unit_number='1A', monthly_rent=Decimal('1000.00'),
+            bedrooms=2, bathrooms=1, square_feet=800
+        )
+
+    def create_lease(self, **fields):
+        values = {
+            'property': self.property,
+            'property_unit': self.unit,
+            'tenant': self.tenant,
+            'start_date': date(2025, 1, 1),
+            'end_date': date(2025, 6, 30),
+            'monthly_rent': Decimal('1000.00'),
+            'security_deposit': Decimal('1000.00'),
+            'rent_due_day': 1,
+            'status': 'active',
+            'terms_and_conditions': 'Standard terms',
+        }
+        values.update(fields)
+        return LeaseAgreement.objects.create(**values)
+
+    def schedule(self, lease, **filters):
+        return list(lease.rent_schedule.filter(**filters).values_list('due_date', 'amount', 'status'))
+
+
+class RentScheduleTests(LeaseFixtureMixin, TestCase):
+    def test_build_clamps_due_day_and_stays_within_term(self):
+        lease = self.create_lease(start_date=date(2025, 1, 15), end_date=date(2025, 5, 20), rent_due_day=31)
+
+        due_dates = [entry.due_date for entry in lease.build_rent_schedule()]
+
+        self.assertEqual(due_dates, [
+            date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30),
+        ])
+
+    def test_build_skips_due_date_before_start(self):
+        lease = self.create_lease(start_date=date(2025, 1, 15), end_date=date(2025, 3, 31), rent_due_day=1)
+
+        due_dates = [entry.due_date for entry in lease.build_rent_schedule()]
+
+        self.assertEqual(due_dates, [date(2025, 2, 1), date(2025, 3, 1)])
+
+    def test_pending_lease_has_no_schedule(self):
+        lease = self.create_lease(status='pending')
+
+        self.assertFalse(lease.rent_schedule.exists())
+
+    def test_activation_materializes_schedule(self):
+        lease = self.create_lease()
+
+        self.assertEqual(lease.rent_schedule.count(), 6)
+        self.assertFalse(lease.rent_schedule.exclude(status='scheduled').exists())
+
+    def test_materialize_is_idempotent(self):
+        lease = self.create_lease()
+        ids = set(lease.rent_schedule.values_list('id', flat=True))
+
+        lease.materialize_rent_schedule()
+
+        self.assertEqual(set(lease.rent_schedule.values_list('id', flat=True)), ids)
+
+    def test_renewal_extends_schedule_and_keeps_invoiced_entries(self):
+        lease = self.create_lease()
+        lease.rent_schedule.filter(due_date=date(2025, 1, 1)).update(status='invoiced')
+
+        lease.end_date = date(2025, 12, 31)
+        lease.monthly_rent = Decimal('1100.00')
+        lease.save()
+
+        self.assertEqual(lease.rent_schedule.count(), 12)
+        self.assertEqual(self.schedule(lease, status='invoiced'), [
+            (date(2025, 1, 1), Decimal('1000.00'), 'invoiced'),
+        ])
+        self.assertEqual(
+            set(lease.rent_schedule.filter(status='scheduled').values_list('amount', flat=True)),
+            {Decimal('1100.00')}
+        )
+
+    def test_shortened_term_drops_months_past_new_end(self):
+        lease = self.create_lease()
+
+        lease.end_date = date(2025, 3, 31)
+        lease.save()
+
+        self.assertEqual([due_date for due_date, _, _ in self.schedule(lease)], [
+            date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1),
+        ])
+
+    def test_cancel_cancels_scheduled_entries_only(self):
+        lease = self.create_lease()
+        lease.rent_schedule.filter(due_date=date(2025, 1, 1)).update(status='invoiced')
+
+        lease.status = 'terminated'
+        lease.save()
+
+        self.assertEqual(lease.rent_schedule.filter(status='invoiced').count(), 1)
+        self.assertEqual(lease.rent_schedule.filter(status='cancelled').count(), 5)
+        self.assertFalse(lease.rent_schedule.filter(status='scheduled').exists())
+
+    def test_save_without_schedule_changes_skips_sync(self):
+        lease = self.create_lease()
+        lease.rent_schedule.filter(due_date=date(2025, 6, 1)).delete()
+        lease = LeaseAgreement.objects.get(pk=lease.pk)
+
+        lease.signed_by_tenant = True
+        with self.assertNumQueries(1):
+            lease.save()
+        with self.assertNumQueries(1):
+            lease.save(update_fields=['terms_and_conditions'])
+
+        self.assertEqual(lease.rent_schedule.count(), 5)
+
+    def test_save_of_unloaded_instance_compares_stored_row(self):
+        lease = self.create_lease()
+        copy = LeaseAgreement.objects.get(pk=lease.pk)
+        copy._loaded_schedule_values = None
+
+        copy.end_date = date(2025, 3, 31)
+        copy.save()
+
+        self.assertEqual(lease.rent_schedule.count(), 3)
+
+    def test_activation_through_update_is_scheduled_by_the_invoice_run(self):
+        lease = self.create_lease(status='pending')
+        LeaseAgreement.objects.filter(pk=lease.pk).update(status='active')
+        self.assertFalse(lease.rent_schedule.exists())
+
+        out = StringIO()
+        call_command('generate_rent_invoices', '--from', '2025-01-01', '--to', '2025-02-28', stdout=out)
+
+        self.assertEqual(lease.rent_schedule.count(), 6)
+        self.assertEqual(lease.rent_schedule.filter(status='invoiced').count(), 2)
+        self.assertIn('Scheduled 6 rent entries', out.getvalue())
+
+    def test_reactivation_through_update_replaces_cancelled_entries(self):
+        lease = self.create_lease()
+        lease.status = 'terminated'
+        lease.save()
+        LeaseAgreement.objects.filter(pk=lease.pk).update(status='active')
+
+        self.assertEqual(schedule_unscheduled_leases(), 6)
+        self.assertEqual(lease.rent_schedule.filter(status='scheduled').count(), 6)
+        self.assertEqual(schedule_unscheduled_leases(), 0)
+
+
+class GenerateRentInvoicesTests(LeaseFixtureMixin, TestCase):
+    def rent_invoices(self, lease):
+        return list(
+            Invoice.objects.filter(lease_agreement=lease, payment_type='rent')
+            .order_by('due_date').values_list('due_date', flat=True)
+        )
+
+    def test_creates_one_invoice_per_due_entry(self):
+        lease = self.create_lease()
+
+        stats = generate_rent_invoices(date(2025, 1, 1), date(2025, 3, 31))
+
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(self.rent_invoices(lease), [date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)])
+        self.assertEqual(lease.rent_schedule.filter(status='invoiced', invoice__isnull=False).count(), 3)
+
+    def test_overlapping_windows_do_not_duplicate(self):
+        lease = self.create_lease()
+
+        generate_rent_invoices(date(2025, 1, 1), date(2025, 3, 31))
+        stats = generate_rent_invoices(date(2025, 2, 1), date(2025, 4, 30))
+        rerun = generate_rent_invoices(date(2025, 1, 1), date(2025, 4, 30))
+
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(rerun['created'], 0)
+        self.assertEqual(self.rent_invoices(lease), [
+            date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1), date(2025, 4, 1),
+        ])
+
+    def test_small_batches_match_single_batch(self):
+        lease = self.create_lease()
+
+        stats = generate_rent_invoices(date(2025, 1, 1), date(2025, 6, 30), batch_size=4)
+
+        self.assertEqual(stats['created'], 6)
+        self.assertEqual(len(set(Invoice.objects.values_list('invoice_number', flat=True))), 6)
+        self.assertFalse(lease.rent_schedule.filter(status='scheduled').exists())
+
+    def test_existing_invoice_is_linked_not_duplicated(self):
+        lease = self.create_lease()
+        invoice = Invoice.objects.create(
+            lease_agreement=lease, property=self.property, property_unit=self.unit, tenant=self.tenant,
+            invoice_number='MANUAL-1', amount=Decimal('1000.00'), payment_type='rent', due_date=date(2025, 2, 1)
+        )
+
+        stats = generate_rent_invoices(date(2025, 2, 1))
+
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(lease.rent_schedule.get(due_date=date(2025, 2, 1)).invoice, invoice)
+
+    def test_cancelled_lease_is_not_invoiced(self):
+        lease = self.create_lease()
+        lease.status = 'terminated'
+        lease.save()
+
+        stats = generate_rent_invoices(date(2025, 1, 1), date(2025, 6, 30))
+
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(self.rent_invoices(lease), [])
+
+
+class CheckpointedInvoiceRunTests(LeaseFixtureMixin, TestCase):
+    def setUp(self):
+        self.lease = self.create_lease()
+        second_property = Property.objects.create(
+            owner=self.owner, title='Oak Row', property_type='residential', address='2 Oak St',
+            city='Springfield', state='IL', postal_code='62701'
+        )
+        second_unit = PropertyUnit.objects.create(
+            property=second_property, unit_number='2A', monthly_rent=Decimal('800.00'),
+            bedrooms=1, bathrooms=1, square_feet=600
+        )
+        self.second_lease = self.create_lease(
+            property=second_property, property_unit=second_unit, monthly_rent=Decimal('800.00')
+        )
+
+    def test_resume_runs_only_unfinished_partitions(self):
+        checkpoints = prepare_checkpoints(date(2025, 1, 1), date(2025, 3, 31), workers=2)
+        self.assertEqual(len(checkpoints), 2)
+
+        # The first partition commits, then the run dies
+        self.assertEqual(run_partition(checkpoints[0].pk)['created'], 3)
+
+        resumed = prepare_checkpoints(date(2025, 1, 1), date(2025, 3, 31), workers=2)
+        self.assertEqual([checkpoint.pk for checkpoint in resumed], [checkpoints[1].pk])
+        self.assertEqual(run_partition(resumed[0].pk)['created'], 3)
+        self.assertIsNone(run_partition(checkpoints[0].pk))
+
+        self.assertEqual(
+            list(InvoiceRunCheckpoint.objects.order_by('partition').values_list('status', 'invoices_created')),
+            [('completed', 3), ('completed', 3)]
+        )
+        self.assertEqual(Invoice.objects.filter(payment_type='rent').count(), 6)
+
+    def test_finished_window_plans_nothing_new(self):
+        for checkpoint in prepare_checkpoints(date(2025, 1, 1), date(2025, 1, 31), workers=2):
+            run_partition(checkpoint.pk)
+
+        self.assertEqual(prepare_checkpoints(date(2025, 1, 1), date(2025, 1, 31), workers=2), [])
+
+    def test_linked_entries_take_no_invoice_numbers(self):
+        Invoice.objects.create(
+            lease_agreement=self.lease, property=self.property, property_unit=self.unit, tenant=self.tenant,
+            invoice_number='MANUAL-1', amount=Decimal('1000.00'), payment_type='rent', due_date=date(2025, 1, 1)
+        )
+
+        for checkpoint in prepare_checkpoints(date(2025, 1, 1), date(2025, 2, 28), workers=2):
+            run_partition(checkpoint.pk)
+
+        numbers = sorted(
+            Invoice.objects.filter(invoice_number__startswith='RENT-').values_list('invoice_number', flat=True)
+        )
+        self.assertEqual(numbers, [f'RENT-{number:09d}' for number in range(1, 4)])
+        self.assertEqual(InvoiceNumberSequence.objects.get(prefix='RENT').next_value, 4)
+
+
+class DocumentJobTests(LeaseFixtureMixin, TestCase):
+    def create_job(self, **fields):
+        # Points at an invoice that doesn't exist, so every render fails
+        values = {'kind': 'invoice', 'object_id': 999999, 'fingerprint': 'x', 'requested_by': self.owner.user,
+                  'filename': 'invoice.pdf'}
+        values.update(fields)
+        return DocumentJob.objects.create(**values)
+
+    def test_failed_render_is_retried_with_growing_delay(self):
+        job = self.create_job()
+
+        self.assertEqual(process_document_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertAlmostEqual(job.next_attempt_at - job.finished_at, RETRY_DELAY, delta=timedelta(seconds=1))
+
+        # Not due yet
+        self.assertEqual(claim_jobs(), [])
+
+        DocumentJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+        process_document_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertAlmostEqual(job.next_attempt_at - job.finished_at, RETRY_DELAY * 2, delta=timedelta(seconds=1))
+
+    def test_gives_up_after_max_attempts(self):
+        job = self.create_job(attempts=MAX_ATTEMPTS - 1)
+
+        process_document_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', MAX_ATTEMPTS))
+        self.assertTrue(job.error)
+
+    def test_stale_claim_out_of_attempts_fails_without_rendering(self):
+        job = self.create_job(
+            status='rendering', attempts=MAX_ATTEMPTS, claimed_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(process_document_jobs(), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', MAX_ATTEMPTS))
+
+
+class PropertyMonthlyStatsTests(LeaseFixtureMixin, TestCase):
+    def stats(self, month):
+        return PropertyMonthlyStats.objects.filter(property=self.property, month=month).values(
+            'billed', 'collected', 'outstanding', 'occupied_units', 'total_units', 'avg_rent'
+        ).first()
+
+    def create_invoice(self, lease, **fields):
+        values = {
+            'lease_agreement': lease, 'property': self.property, 'property_unit': self.unit, 'tenant': self.tenant,
+            'invoice_number': f'TEST-{Invoice.objects.count() + 1}', 'amount': Decimal('1000.00'),
+            'due_date': date(2025, 2, 1),
+        }
+        values.update(fields)
+        return Invoice.objects.create(**values)
+
+    def test_invoice_hooks_refresh_due_and_payment_months(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = self.create_lease()
+            invoice = self.create_invoice(lease)
+        self.assertEqual(self.stats(date(2025, 2, 1))['billed'], Decimal('1000.00'))
+        self.assertEqual(self.stats(date(2025, 2, 1))['outstanding'], Decimal('1000.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.status = 'paid'
+            invoice.payment_date = date(2025, 3, 4)
+            invoice.save()
+        self.assertEqual(self.stats(date(2025, 2, 1))['outstanding'], Decimal('0.00'))
+        self.assertEqual(self.stats(date(2025, 3, 1))['collected'], Decimal('1000.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.delete()
+        self.assertEqual(self.stats(date(2025, 2, 1))['billed'], Decimal('0.00'))
+        self.assertEqual(self.stats(date(2025, 3, 1))['collected'], Decimal('0.00'))
+
+    def test_lease_hooks_refresh_occupancy_over_the_term(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = self.create_lease(monthly_rent=Decimal('1200.00'))
+
+        months = list(PropertyMonthlyStats.objects.filter(property=self.property).values_list('month', flat=True))
+        self.assertEqual(months, [date(2025, month, 1) for month in range(1, 7)])
+        self.assertEqual(self.stats(date(2025, 3, 1)), {
+            'billed': Decimal('0.00'), 'collected': Decimal('0.00'), 'outstanding': Decimal('0.00'),
+            'occupied_units': 1, 'total_units': 1, 'avg_rent': Decimal('1200.00'),
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lease.status = 'terminated'
+            lease.save()
+        self.assertEqual(self.stats(date(2025, 3, 1))['occupied_units'], 0)
+        self.assertEqual(self.stats(date(2025, 3, 1))['avg_rent'], Decimal('0.00'))
+
+    def test_pending_lease_does_not_count_as_occupied(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_lease(status='pending')
+
+        self.assertEqual(self.stats(date(2025, 1, 1))['occupied_units'], 0)
+
+    def test_moved_lease_refreshes_old_months(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = self.create_lease()
+        with self.captureOnCommitCallbacks(execute=True):
+            lease.start_date, lease.end_date = date(2026, 1, 1), date(2026, 6, 30)
+            lease.save()
+
+        self.assertEqual(self.stats(date(2025, 3, 1))['occupied_units'], 0)
+        self.assertEqual(self.stats(date(2026, 3, 1))['occupied_units'], 1)
+
+    def test_sweep_refreshes_swept_months(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = self.create_lease()
+            self.create_invoice(lease)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('sweep_overdue_invoices', flat_fee=Decimal('50'), percent_fee=Decimal('0'), stdout=StringIO())
+
+        self.assertEqual(self.stats(date(2025, 2, 1))['billed'], Decimal('1050.00'))
+        self.assertEqual(self.stats(date(2025, 2, 1))['outstanding'], Decimal('1050.00'))
+
+    def test_unit_hooks_refresh_current_and_later_months(self):
+        current = month_start(timezone.now().date())
+        later = month_start(current + timedelta(days=40))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_lease(start_date=current, end_date=later + timedelta(days=27))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unit = PropertyUnit.objects.create(
+                property=self.property, unit_number='1B', monthly_rent=Decimal('900.00'),
+                bedrooms=1, bathrooms=1, square_feet=500
+            )
+        self.assertEqual(self.stats(current)['total_units'], 2)
+        self.assertEqual(self.stats(later)['total_units'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unit.delete()
+        self.assertEqual(self.stats(later)['total_units'], 1)
+
+    def test_roll_forward_adds_current_month_for_idle_properties(self):
+        current = month_start(timezone.now().date())
+        self.assertIsNone(self.stats(current))
+
+        out = StringIO()
+        call_command('rebuild_property_stats', '--current', stdout=out)
+
+        self.assertEqual(self.stats(current)['total_units'], 1)
+        self.assertIn('Wrote 1 ', out.getvalue())
+
+    def test_roll_forward_rejects_range_options(self):
+        with self.assertRaises(CommandError):
+            call_command('rebuild_property_stats', '--current', '--from', '2025-01', stdout=StringIO())
+
+    def test_portfolio_revenue_reads_current_month_rollup(self):
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = self.create_lease(start_date=month_start(today), end_date=month_start(today) + timedelta(days=27))
+            self.create_invoice(lease, due_date=today, status='paid', payment_date=today)
+
+        analytics = portfolio_analytics([self.property.id], today)[self.property.id]
+
+        self.assertEqual(analytics['monthly_revenue'], Decimal('1000.00'))
+        self.assertEqual(analytics['active_leases'], 1)
+
+
+class RevenueSeriesTests(LeaseFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lease = self.create_lease()
+
+    def create_invoice(self, due_date, amount='100.00', **fields):
+        return Invoice.objects.create(
+            lease_agreement=self.lease, property=self.property, property_unit=self.unit, tenant=self.tenant,
+            invoice_number=f'TEST-{Invoice.objects.count() + 1}', amount=Decimal(amount), due_date=due_date, **fields
+        )
+
+    def totals(self, series):
+        return [(bucket['period'], bucket['billed'], bucket['collected']) for bucket in series]
+
+    def test_month_buckets_split_billed_and_collected(self):
+        self.create_invoice(date(2025, 1, 31), '100.00', status='paid', payment_date=date(2025, 2, 1))
+        self.create_invoice(date(2025, 2, 1), '200.00')
+        self.create_invoice(date(2025, 2, 28), '400.00', status='cancelled')
+
+        series = revenue_series(self.owner.id, date(2025, 1, 1), date(2025, 3, 31))
+
+        self.assertEqual(self.totals(series), [
+            (date(2025, 1, 1), Decimal('100.00'), Decimal('0.00')),
+            (date(2025, 2, 1), Decimal('200.00'), Decimal('100.00')),
+            (date(2025, 3, 1), Decimal('0.00'), Decimal('0.00')),
+        ])
+
+    def test_range_ends_are_inclusive(self):
+        self.create_invoice(date(2025, 1, 9), '1.00')
+        self.create_invoice(date(2025, 1, 10), '10.00')
+        self.create_invoice(date(2025, 1, 12), '100.00')
+        self.create_invoice(date(2025, 1, 13), '1000.00')
+
+        series = revenue_series(self.owner.id, date(2025, 1, 10), date(2025, 1, 12), 'day')
+
+        self.assertEqual(
+            [bucket['period'] for bucket in series], [date(2025, 1, 10), date(2025, 1, 11), date(2025, 1, 12)]
+        )
+        self.assertEqual(sum(bucket['billed'] for bucket in series), Decimal('110.00'))
+
+    def test_week_buckets_start_on_monday(self):
+        # 2025-01-05 is a Sunday, 2025-01-06 a Monday
+        self.create_invoice(date(2025, 1, 5), '10.00')
+        self.create_invoice(date(2025, 1, 6), '20.00')
+
+        series = revenue_series(self.owner.id, date(2025, 1, 1), date(2025, 1, 12), 'week')
+
+        self.assertEqual(self.totals(series), [
+            (date(2024, 12, 30), Decimal('10.00'), Decimal('0.00')),
+            (date(2025, 1, 6), Decimal('20.00'), Decimal('0.00')),
+        ])
+
+    def january(self):
+        return revenue_series(self.owner.id, date(2025, 1, 1), date(2025, 1, 31))
+
+    def test_invoice_save_invalidates_cached_series(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = self.create_invoice(date(2025, 1, 15), '100.00')
+        self.assertEqual(self.january()[0]['billed'], Decimal('100.00'))
+
+        # Cached: a change behind the hooks' back isn't seen
+        Invoice.objects.filter(pk=invoice.pk).update(total_amount=Decimal('150.00'))
+        self.assertEqual(self.january()[0]['billed'], Decimal('100.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.refresh_from_db()
+            invoice.status = 'paid'
+            invoice.payment_date = date(2025, 1, 20)
+            invoice.save()
+        self.assertEqual(self.totals(self.january()), [(date(2025, 1, 1), Decimal('150.00'), Decimal('150.00'))])
+
+    def test_rejects_bad_granularity_and_long_ranges(self):
+        with self.assertRaises(ValueError):
+            revenue_series(self.owner.id, date(2025, 1, 1), date(2025, 1, 31), 'hour')
+        with self.assertRaises(ValueError):
+            revenue_series(self.owner.id, date(2020, 1, 1), date(2025, 1, 1), 'day')
+
+    def test_parse_series_params(self):
+        default = (date(2025, 1, 1), date(2025, 1, 31))
 
-# Create your tests here.
+        self.assertEqual(parse_series_params({}, *default), (*default, 'month'))
+        self.assertEqual(
+            parse_series_params({'start': '2025-01-10', 'end': '2025-01-20', 'granularity': 'week'}, *default),
+            (date(2025, 1, 10), date(2025, 1, 20), 'week')
+        )
+        for params in ({'start': '2025-02-01'}, {'start': 'yesterday'}, {'granularity': 'hour'}):
+            with self.assertRaises(ValueError):
+                parse_series_params(params, *default)
@@ -44,6 +44,9 @@ urlpatterns = [
     path('invoice/<int:pk>/pay/', views.tenant_make_payment, name='tenant_make_payment'),
     path('invoice/<int:pk>/payment/success/', views.payment_success, name='payment_success'),
     path('invoice/<int:pk>/download/', views.download_invoice, name='download_invoice'),
+    path('<int:property_pk>/invoices/export/', views.export_invoices, name='export_invoices'),
+    path('documents/<int:pk>/', views.document_job, name='document_job'),
+    path('documents/<int:pk>/download/', views.document_job_download, name='document_job_download'),
 
     # Bank Account URLs
     path('properties/<int:property_pk>/bank-accounts/<int:account_pk>/delete/', views.bank_account_delete, name='bank_account_delete'),
@@ -67,5 +70,6 @@ urlpatterns = [
 
     #property analytics
     path('property-analytics/', views.property_analytics, name='property_analytics'),
+    path('analytics/revenue/', views.revenue_trend, name='revenue_trend'),
 
 ]
\ No newline at end of file
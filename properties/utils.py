@@ -2,10 +2,9 @@ from django.core.exceptions import ValidationError
 from accounts.models import PropertyOwnerSubscription
 from django.utils import timezone
 from django.db import transaction
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from notifications.outbox import enqueue_mail, enqueue_mass_mail
+from utils.email_rendering import render_email
 from django.conf import settings
-from django.utils.html import strip_tags
 from django.contrib import messages
 
 def verify_subscription_and_limit(property_owner, request=None):
@@ -98,19 +97,19 @@ def check_unit_limit(property, request=None):
 def send_maintenance_request_notification(maintenance_request, request=None):
     """
     Send email notifications for maintenance requests.
-    Returns True if sent successfully, adds error message and returns False if failed.
+    Emails are queued in the outbox for run_mail_worker.
+    Returns True if queued successfully, adds error message and returns False if failed.
     """
     try:
         # Email to property owner
         owner_subject = f'New Maintenance Request - {maintenance_request.property.title}'
-        owner_html_message = render_to_string('emails/maintenance_request_owner.html', {
+        owner_html_message, owner_plain_message = render_email('emails/maintenance_request_owner.html', {
             'request': maintenance_request,
             'property': maintenance_request.property,
             'tenant': maintenance_request.tenant
         })
-        owner_plain_message = strip_tags(owner_html_message)
         
-        send_mail(
+        enqueue_mail(
             subject=owner_subject,
             message=owner_plain_message,
             html_message=owner_html_message,
@@ -121,13 +120,12 @@ def send_maintenance_request_notification(maintenance_request, request=None):
 
         # Confirmation email to tenant
         tenant_subject = 'Maintenance Request Submitted Successfully'
-        tenant_html_message = render_to_string('emails/maintenance_request_tenant.html', {
+        tenant_html_message, tenant_plain_message = render_email('emails/maintenance_request_tenant.html', {
             'request': maintenance_request,
             'property': maintenance_request.property
         })
-        tenant_plain_message = strip_tags(tenant_html_message)
         
-        send_mail(
+        enqueue_mail(
             subject=tenant_subject,
             message=tenant_plain_message,
             html_message=tenant_html_message,
@@ -146,18 +144,18 @@ def send_maintenance_request_notification(maintenance_request, request=None):
 def send_invoice_notification(invoice, request=None):
     """
     Send email notifications for new invoices.
-    Returns True if sent successfully, adds error message and returns False if failed.
+    Emails are queued in the outbox for run_mail_worker.
+    Returns True if queued successfully, adds error message and returns False if failed.
     """
     try:
         subject = f'New Invoice - {invoice.property.title}'
-        html_message = render_to_string('emails/invoice_notification.html', {
+        html_message, plain_message = render_email('emails/invoice_notification.html', {
             'invoice': invoice,
             'property': invoice.property,
             'tenant': invoice.tenant
         })
-        plain_message = strip_tags(html_message)
         
-        send_mail(
+        enqueue_mail(
             subject=subject,
             message=plain_message,
             html_message=html_message,
@@ -173,22 +171,44 @@ def send_invoice_notification(invoice, request=None):
             raise ValidationError("Failed to send invoice notification.")
         return False
 
+def queue_invoice_notifications(invoices):
+    """
+    Queue the new-invoice email for many invoices at once (for bulk invoice
+    runs); ``invoices`` should come with property and tenant__user selected.
+    Returns the number of emails queued.
+    """
+    emails = []
+    for invoice in invoices:
+        html_message, plain_message = render_email('emails/invoice_notification.html', {
+            'invoice': invoice,
+            'property': invoice.property,
+            'tenant': invoice.tenant
+        })
+        emails.append((
+            f'New Invoice - {invoice.property.title}',
+            plain_message,
+            html_message,
+            settings.DEFAULT_FROM_EMAIL,
+            [invoice.tenant.user.email],
+        ))
+    return enqueue_mass_mail(emails)
+
 def send_lease_notification(lease, request=None):
     """
     Send email notifications for lease creation/updates.
-    Returns True if sent successfully, adds error message and returns False if failed.
+    Emails are queued in the outbox for run_mail_worker.
+    Returns True if queued successfully, adds error message and returns False if failed.
     """
     try:
         # Email to tenant
         tenant_subject = f'New Lease Agreement - {lease.property.title}'
-        tenant_html_message = render_to_string('emails/lease_notification_tenant.html', {
+        tenant_html_message, tenant_plain_message = render_email('emails/lease_notification_tenant.html', {
             'lease': lease,
             'property': lease.property,
             'owner': lease.property.owner
         })
-        tenant_plain_message = strip_tags(tenant_html_message)
         
-        send_mail(
+        enqueue_mail(
             subject=tenant_subject,
             message=tenant_plain_message,
             html_message=tenant_html_message,
@@ -199,14 +219,13 @@ def send_lease_notification(lease, request=None):
 
         # Confirmation email to property owner
         owner_subject = f'Lease Agreement Created - {lease.property.title}'
-        owner_html_message = render_to_string('emails/lease_notification_owner.html', {
+        owner_html_message, owner_plain_message = render_email('emails/lease_notification_owner.html', {
             'lease': lease,
             'property': lease.property,
             'tenant': lease.tenant
         })
-        owner_plain_message = strip_tags(owner_html_message)
         
-        send_mail(
+        enqueue_mail(
             subject=owner_subject,
             message=owner_plain_message,
             html_message=owner_html_message,
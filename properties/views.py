@@ -6,20 +6,17 @@ from datetime import datetime, timedelta
 from .models import Property, LeaseAgreement,TenantProperty
 from decimal import Decimal
 import json
-from django.db.models.functions import TruncMonth
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponseForbidden
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from datetime import date
-from django.db.models import Avg, Sum
 from .utils import check_property_limit
 from django.conf import settings
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
-import pdfkit
 import json
 import logging
 import stripe
@@ -30,12 +27,17 @@ from properties.utils import (
 )
 from .utils import check_unit_limit
 from datetime import datetime, timedelta
-from notifications.utils import create_notification
-from .models import Property, PropertyUnit, LeaseAgreement, BankAccount, PropertyMaintenance,PropertyImage,PropertyManager
+from notifications.utils import create_notification, create_notifications_bulk, queue_notification
+from .models import Property, PropertyUnit, LeaseAgreement, BankAccount, PropertyMaintenance,PropertyImage,PropertyManager, DocumentJob
 from accounts.models import Tenant, PropertyOwner
 from payments.models import Invoice
 from accounts.forms import CustomUserCreationForm
 from properties.utils import save_property_with_limit_check
+from .documents import (
+    cached_document_path, document_filename, document_objects, export_invoices_zip, find_cached_document, month_invoices
+)
+from .document_jobs import enqueue_document
+from .analytics import parse_series_params, portfolio_analytics, portfolio_rent_trend, revenue_series
 logger = logging.getLogger(__name__)
 
 from django.forms import inlineformset_factory
@@ -685,23 +687,15 @@ def lease_status_change(request, property_pk, pk):
         lease.status = new_status
         lease.save()
 
-        # Create notification for tenant
-        create_notification(
-            recipient=lease.tenant.user,
-            notification_type='lease_update',
-            title='Lease Agreement Status Updated',
-            message=f'The status of your lease agreement for {property.title} has been updated to {new_status}.',
-            related_object=lease
-        )
-
-        # Create notification for property owner
-        create_notification(
-            recipient=property.owner.user,
-            notification_type='lease_update',
-            title='Lease Agreement Status Updated',
-            message=f'The status of the lease agreement for {lease.tenant.user.get_full_name()} at {property.title} has been updated to {new_status}.',
-            related_object=lease
-        )
+        # Notify the tenant and the property owner in one insert
+        create_notifications_bulk([
+            (lease.tenant.user, 'lease_update', 'Lease Agreement Status Updated',
+             f'The status of your lease agreement for {property.title} has been updated to {new_status}.',
+             lease),
+            (property.owner.user, 'lease_update', 'Lease Agreement Status Updated',
+             f'The status of the lease agreement for {lease.tenant.user.get_full_name()} at {property.title} has been updated to {new_status}.',
+             lease),
+        ])
 
         return JsonResponse({'status': 'success'})
     except json.JSONDecodeError:
@@ -928,178 +922,110 @@ def invoice_detail(request, pk):
         'property_address':property_address
     })
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from io import BytesIO
-
 @login_required
 def download_invoice(request, pk):
     """Download invoice as PDF"""
-    invoice = get_object_or_404(Invoice, pk=pk)
+    invoice = get_object_or_404(document_objects('invoice'), pk=pk)
 
     # Check permissions - only property owner can download
     if not request.user.is_property_owner or invoice.property.owner.user != request.user:
         messages.error(request, "Only property owners can download invoices.")
         return redirect('accounts:dashboard')
 
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Header
-    elements.append(Paragraph(f"INVOICE #{invoice.invoice_number}", styles['Heading1']))
-    elements.append(Spacer(1, 20))
-
-    # Company Info
-    elements.append(Paragraph("Rental Management System", styles['Heading2']))
-    elements.append(Spacer(1, 20))
-
-    # Invoice Details
-    data = [
-        ["Issue Date:", invoice.issue_date.strftime("%B %d, %Y")],
-        ["Due Date:", invoice.due_date.strftime("%B %d, %Y")],
-        ["Status:", invoice.status.title()],
-        ["Property:", invoice.property.title],
-        ["Unit:", invoice.lease_agreement.property_unit.unit_number],
-        ["Tenant:", invoice.tenant.user.get_full_name()],
-    ]
-
-    table = Table(data, colWidths=[2*inch, 4*inch])
-    table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 20))
-
-    # Amount Details
-    amount_data = [
-        ["Description", "Amount"],
-        ["Amount", f"₹{invoice.amount}"],
-    ]
-    if invoice.late_fee > 0:
-        amount_data.append(["Late Fee", f"₹{invoice.late_fee}"])
-    amount_data.append(["Total Amount", f"₹{invoice.total_amount}"])
-
-    amount_table = Table(amount_data, colWidths=[3*inch, 3*inch])
-    amount_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-    ]))
-    elements.append(amount_table)
-
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="invoice_{invoice.invoice_number}.pdf"'
-    response.write(pdf)
-
-    return response
+    path = find_cached_document('invoice', invoice)
+    if path is None:
+        if settings.DOCUMENT_RENDER_ASYNC:
+            return _document_job_response(request, enqueue_document('invoice', invoice, request.user))
+        path = cached_document_path('invoice', invoice)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=document_filename('invoice', invoice),
+        content_type='application/pdf'
+    )
 
 @login_required
 def download_lease(request, pk):
     """Download lease agreement as PDF"""
-    lease = get_object_or_404(LeaseAgreement, pk=pk)
+    lease = get_object_or_404(document_objects('lease'), pk=pk)
 
     # Check permissions - only property owner can download
     if not request.user.is_property_owner or lease.property.owner.user != request.user:
         messages.error(request, "Only property owners can download lease agreements.")
         return redirect('accounts:dashboard')
 
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Header
-    elements.append(Paragraph("LEASE AGREEMENT", styles['Heading1']))
-    elements.append(Spacer(1, 20))
-
-    # Property Details
-    elements.append(Paragraph("Property Information", styles['Heading2']))
-    property_data = [
-        ["Property Name:", lease.property.title],
-        ["Address:", lease.property.address],
-        ["Unit:", lease.property_unit.unit_number],
-    ]
-
-    property_table = Table(property_data, colWidths=[2*inch, 4*inch])
-    property_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    elements.append(property_table)
-    elements.append(Spacer(1, 20))
-
-    # Lease Terms
-    elements.append(Paragraph("Lease Terms", styles['Heading2']))
-    terms_data = [
-        ["Start Date:", lease.start_date.strftime("%B %d, %Y")],
-        ["End Date:", lease.end_date.strftime("%B %d, %Y")],
-        ["Monthly Rent:", f"₹{lease.monthly_rent}"],
-        ["Security Deposit:", f"₹{lease.security_deposit}"],
-    ]
-
-    terms_table = Table(terms_data, colWidths=[2*inch, 4*inch])
-    terms_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    elements.append(terms_table)
-    elements.append(Spacer(1, 20))
-
-    # Signatures
-    elements.append(Paragraph("Signatures", styles['Heading2']))
-    elements.append(Spacer(1, 40))
-
-    sig_data = [
-        ["_________________________", "_________________________"],
-        ["Property Owner", "Tenant"],
-        [lease.property.owner.user.get_full_name(), lease.tenant.user.get_full_name()],
-        ["Date: ________________", "Date: ________________"],
-    ]
-
-    sig_table = Table(sig_data, colWidths=[3*inch, 3*inch])
-    sig_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    elements.append(sig_table)
-
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="lease_agreement_{lease.id}.pdf"'
-    response.write(pdf)
+    path = find_cached_document('lease', lease)
+    if path is None:
+        if settings.DOCUMENT_RENDER_ASYNC:
+            return _document_job_response(request, enqueue_document('lease', lease, request.user))
+        path = cached_document_path('lease', lease)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=document_filename('lease', lease),
+        content_type='application/pdf'
+    )
+
+def _document_job_status(job):
+    status = {'id': job.id, 'status': job.status, 'filename': job.filename}
+    if job.status == 'ready':
+        status['download_url'] = reverse('properties:document_job_download', kwargs={'pk': job.pk})
+    return status
+
+def _document_job_response(request, job):
+    """Hand an uncached download over to run_document_worker; the client polls the job"""
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(_document_job_status(job), status=202)
+    return redirect('properties:document_job', pk=job.pk)
+
+@login_required
+def document_job(request, pk):
+    """Status of a PDF rendering job: JSON for polling, or a page that polls until the file is ready"""
+    job = get_object_or_404(
+        DocumentJob.objects.only('id', 'status', 'filename', 'requested_by_id'),
+        pk=pk,
+        requested_by=request.user
+    )
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(_document_job_status(job))
+    return render(request, 'properties/document_job.html', {'job': job})
+
+@login_required
+def document_job_download(request, pk):
+    """Download the PDF of a finished rendering job"""
+    job = get_object_or_404(DocumentJob, pk=pk, requested_by=request.user)
+    if job.status != 'ready':
+        return redirect('properties:document_job', pk=job.pk)
+    try:
+        document = open(job.file_path, 'rb')
+    except FileNotFoundError:
+        # Superseded by a newer version of the document; request that one instead
+        download_view = 'properties:download_invoice' if job.kind == 'invoice' else 'properties:download_lease'
+        return redirect(download_view, pk=job.object_id)
+    return FileResponse(document, as_attachment=True, filename=job.filename, content_type='application/pdf')
+
+@login_required
+def export_invoices(request, property_pk):
+    """Download every invoice of a property due in ?month=YYYY-MM as one ZIP of PDFs"""
+    property = get_object_or_404(Property, pk=property_pk)
+
+    # Check permissions - only property owner can download
+    if not request.user.is_property_owner or property.owner.user != request.user:
+        messages.error(request, "Only property owners can download invoices.")
+        return redirect('accounts:dashboard')
+
+    try:
+        month = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        month = timezone.now().date().replace(day=1)
+
+    invoices = month_invoices(property.pk, month)
+    if not invoices.exists():
+        messages.error(request, f"No invoices are due in {month.strftime('%B %Y')}.")
+        return redirect('properties:property_detail', pk=property.pk)
 
+    response = StreamingHttpResponse(export_invoices_zip(invoices), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="invoices_{property.pk}_{month.strftime("%Y-%m")}.zip"'
     return response
 
 from datetime import date, timedelta
@@ -1257,10 +1183,10 @@ def maintenance_request_change_status(request, pk):
                 maintenance.resolved_date = timezone.now()
             maintenance.save()
 
-            # Create notification for tenant
-            create_notification(
+            # Notify the tenant; updates arriving close together are delivered as one digest
+            queue_notification(
                 recipient=maintenance.reported_by,
-                notification_type='maintenance_status_update',
+                notification_type='maintenance_update',
                 title='Maintenance Request Status Updated',
                 message=f'Your maintenance request for {maintenance.property.title} has been updated to {maintenance.get_status_display()}',
                 related_object=maintenance
@@ -1428,41 +1354,7 @@ def property_delete(request, pk):
 
 def get_property_analytics(property):
     """Generate analytics for a specific property"""
-    # Get all leases for this property
-    leases = LeaseAgreement.objects.filter(property_unit__property=property)
-
-    # Calculate occupancy rate
-    total_units = property.units.count()
-    occupied_units = property.units.filter(is_available=False).count()
-    occupancy_rate = (occupied_units / total_units * 100) if total_units > 0 else 0
-
-    # Calculate average rent
-    avg_rent = leases.filter(status='active').aggregate(Avg('monthly_rent'))['monthly_rent__avg'] or 0
-
-    # Calculate revenue metrics
-    current_month = datetime.now().replace(day=1)
-    monthly_revenue = Invoice.objects.filter(
-        lease_agreement__property_unit__property=property,
-        issue_date__year=current_month.year,
-        issue_date__month=current_month.month,
-        status='paid'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-    # Calculate tenant metrics
-    total_tenants = property.property_tenants.count()
-    active_leases = leases.filter(status='active').count()
-    tenant_turnover_rate = ((total_tenants - active_leases) / total_tenants * 100) if total_tenants > 0 else 0
-
-    return {
-        'occupancy_rate': round(occupancy_rate, 2),
-        'avg_rent': round(avg_rent, 2),
-        'monthly_revenue': monthly_revenue,
-        'tenant_turnover_rate': round(tenant_turnover_rate, 2),
-        'total_units': total_units,
-        'occupied_units': occupied_units,
-        'total_tenants': total_tenants,
-        'active_leases': active_leases
-    }
+    return portfolio_analytics([property.pk])[property.pk]
 
 @login_required
 def property_analytics(request, pk):
@@ -1496,8 +1388,10 @@ def overall_property_analytics(request):
         return HttpResponseForbidden()
 
     properties = Property.objects.filter(owner__user=request.user)
+    property_titles = dict(properties.values_list('id', 'title'))
+    portfolio = portfolio_analytics(list(property_titles))
 
-    total_properties = properties.count()
+    total_properties = len(property_titles)
     total_units = 0
     total_occupied_units = 0
     total_revenue = Decimal('0.0')
@@ -1505,15 +1399,15 @@ def overall_property_analytics(request):
     all_rents = []
     property_analytics = []
 
-    for prop in properties:
-        analytics = get_property_analytics(prop)
+    for property_id, title in property_titles.items():
+        analytics = portfolio[property_id]
         monthly_revenue = analytics.get('monthly_revenue', Decimal('0.0'))
 
         # Add revenue into analytics to make template usage consistent
         analytics['monthly_revenue'] = float(monthly_revenue)
 
         property_analytics.append({
-            'name': prop.title,
+            'name': title,
             'analytics': analytics
         })
 
@@ -1528,27 +1422,22 @@ def overall_property_analytics(request):
     overall_avg_rent = sum(all_rents) / len(all_rents) if all_rents else 0
 
     # --- Rent Trend (last 6 months)
-    current_month = datetime.now().replace(day=1)
+    current_month = timezone.now().date().replace(day=1)
     six_months_ago = current_month - timedelta(days=180)
-
-    lease_history = LeaseAgreement.objects.filter(
-        property_unit__property__in=properties,
-        start_date__gte=six_months_ago
-    ).annotate(
-        month=TruncMonth('start_date')
-    ).values('month').annotate(
-        avg_rent=Avg('monthly_rent')
-    ).order_by('month')
+    rent_trend = portfolio_rent_trend(list(property_titles), six_months_ago, current_month)
 
     rent_chart_data = {
-        'dates': [entry['month'].strftime('%b %Y') for entry in lease_history],
-        'rents': [float(entry['avg_rent']) if entry['avg_rent'] else 0 for entry in lease_history]
+        'dates': [month.strftime('%b %Y') for month, _ in rent_trend],
+        'rents': [float(rent) for _, rent in rent_trend]
     }
 
-    # --- Revenue Trend (mocked here from rent * 10 logic)
+    # --- Revenue Trend (collected per month, last 6 months)
+    owner_id = PropertyOwner.objects.filter(user=request.user).values_list('id', flat=True).first()
+    revenue_trend = revenue_series(owner_id, six_months_ago, timezone.now().date(), 'month') if owner_id else []
     revenue_chart_data = {
-        'dates': rent_chart_data['dates'],
-        'amounts': [float(entry['avg_rent']) * 10 if entry['avg_rent'] else 0 for entry in lease_history]
+        'dates': [bucket['period'].strftime('%b %Y') for bucket in revenue_trend],
+        'amounts': [float(bucket['collected']) for bucket in revenue_trend],
+        'billed': [float(bucket['billed']) for bucket in revenue_trend]
     }
 
     # Sortings
@@ -1571,6 +1460,32 @@ def overall_property_analytics(request):
 
     return render(request, 'properties/property_analytics.html', context)
 
+@login_required
+def revenue_trend(request):
+    """Billed vs collected revenue per bucket as JSON, for ?start=&end=&granularity=day|week|month"""
+    owner = get_object_or_404(PropertyOwner, user=request.user)
+
+    today = timezone.now().date()
+    try:
+        start, end, granularity = parse_series_params(request.GET, today - timedelta(days=365), today)
+        series = revenue_series(owner.id, start, end, granularity)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': [
+            {
+                'period': bucket['period'].isoformat(),
+                'billed': float(bucket['billed']),
+                'collected': float(bucket['collected'])
+            }
+            for bucket in series
+        ]
+    })
+
 
 @login_required
 def tenant_delete(request, tenant_pk):
@@ -2,6 +2,8 @@
 ASGI config for rms project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn rms.asgi:application``) for the
+server-sent notification stream; under WSGI the page falls back to polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
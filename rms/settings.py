@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables
 load_dotenv()
@@ -80,6 +81,28 @@ DATABASES = {
     }
 }
 
+# Cache shared by every web process, worker and cron command; the notification
+# stream, unread counters and revenue charts are written from all of them, so
+# outside DEBUG it can't be the per-process LocMemCache. Without CACHE_BACKEND,
+# DEBUG uses LocMem and anything else a file cache under BASE_DIR, which every
+# process on one host shares; use RedisCache once there is more than one host
+CACHE_BACKEND = os.getenv('CACHE_BACKEND')
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', '')
+if not CACHE_BACKEND:
+    if DEBUG:
+        CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+    else:
+        CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+        CACHE_LOCATION = CACHE_LOCATION or str(BASE_DIR / 'django_cache')
+elif not DEBUG and CACHE_BACKEND.endswith('.LocMemCache'):
+    raise ImproperlyConfigured('LocMemCache is not shared between processes; set CACHE_BACKEND to a shared cache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,6 +134,15 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generated invoice/lease PDFs, keyed by a hash of their content. Kept out of
+# MEDIA_ROOT since these are private documents served through views.
+DOCUMENT_CACHE_DIR = os.getenv('DOCUMENT_CACHE_DIR', str(BASE_DIR / 'document_cache'))
+# With True, uncached invoice/lease downloads are queued for run_document_worker
+# and the browser polls until the PDF is ready; by default they render in the request
+DOCUMENT_RENDER_ASYNC = os.getenv('DOCUMENT_RENDER_ASYNC', 'False') == 'True'
+# Processes rendering uncached PDFs for the export_invoices command (web exports render in-process)
+DOCUMENT_EXPORT_WORKERS = int(os.getenv('DOCUMENT_EXPORT_WORKERS', '4'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -131,6 +163,34 @@ STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
 
+# Late fees applied when sweep_overdue_invoices marks an invoice overdue
+LATE_FEE_GRACE_DAYS = int(os.getenv('LATE_FEE_GRACE_DAYS', '0'))
+LATE_FEE_FLAT = os.getenv('LATE_FEE_FLAT', '0')
+LATE_FEE_PERCENT = os.getenv('LATE_FEE_PERCENT', '0')
+
+# Server-sent notification stream: how often each open stream checks for
+# changes, and how long a stream lives before the browser reconnects
+NOTIFICATION_STREAM_POLL_SECONDS = float(os.getenv('NOTIFICATION_STREAM_POLL_SECONDS', '2'))
+NOTIFICATION_STREAM_MAX_SECONDS = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', '300'))
+
+# Days read notifications of each type stay in the notifications table before
+# archive_notifications moves them out; types not listed are kept forever
+NOTIFICATION_RETENTION_DAYS = {
+    'system': 30,
+    'payment_due': 90,
+    'maintenance_update': 180,
+    'payment_received': 365,
+    'lease_update': 365,
+}
+
+# Minutes notifications of each type are buffered per recipient before
+# flush_notification_digests sends them as one digest notification and email;
+# types not listed are delivered immediately
+NOTIFICATION_DIGEST_WINDOWS = {
+    'payment_received': 15,
+    'maintenance_update': 15,
+}
+
 #email
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = "smtp.gmail.com"
@@ -140,6 +200,13 @@ EMAIL_HOST_USER = 'hemanthrockzzzz199@gmail.com'
 EMAIL_HOST_PASSWORD = 'mmvi vklq vbks xsiv'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Outbox drained by run_mail_worker: failed sends are retried after
+# EMAIL_OUTBOX_RETRY_SECONDS, doubling each attempt, up to EMAIL_OUTBOX_MAX_ATTEMPTS
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', '60'))
+# Messages sent over one SMTP connection before reconnecting (provider limit)
+EMAIL_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('EMAIL_MAX_MESSAGES_PER_CONNECTION', '100'))
+
 
 # Security settings for production
 if DEBUG:
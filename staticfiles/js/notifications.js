@@ -2,7 +2,7 @@
 
 document.addEventListener("DOMContentLoaded", function() {
     function fetchNotifications() {
-        fetch('/notifications/')
+        fetch('/account-notifications/')
             .then(response => response.json())
             .then(data => {
                 const notificationList = document.getElementById('notification-list');
@@ -13,7 +13,7 @@ document.addEventListener("DOMContentLoaded", function() {
                     li.innerHTML = `${notification.message} <small>${notification.timestamp}</small>`;
                     if (!notification.is_read) {
                         const markAsReadLink = document.createElement('a');
-                        markAsReadLink.href = `/notifications/mark-as-read/${notification.id}/`;
+                        markAsReadLink.href = `/account-notifications/${notification.id}/mark-as-read/`;
                         markAsReadLink.innerText = 'Mark as Read';
                         li.appendChild(markAsReadLink);
                     }
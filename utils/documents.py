@@ -0,0 +1,92 @@
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
+
+
+@lru_cache(maxsize=None)
+def _reportlab():
+    """reportlab is only imported the first time a document is built"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    return SimpleNamespace(
+        colors=colors, A4=A4, getSampleStyleSheet=getSampleStyleSheet, inch=inch,
+        SimpleDocTemplate=SimpleDocTemplate, Table=Table, TableStyle=TableStyle,
+        Paragraph=Paragraph, Spacer=Spacer
+    )
+
+
+@lru_cache(maxsize=None)
+def _styles():
+    """
+    Paragraph and table styles shared by every document, built once per
+    process. They are only read while a document builds, so concurrent
+    requests can share them.
+    """
+    rl = _reportlab()
+    body = [
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ]
+    return {
+        'paragraphs': rl.getSampleStyleSheet(),
+        # Label/value rows
+        'details': rl.TableStyle([('ALIGN', (0, 0), (-1, -1), 'LEFT')] + body),
+        # Description/amount grid with a header row
+        'amounts': rl.TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, rl.colors.black),
+            ('BACKGROUND', (0, 0), (-1, 0), rl.colors.lightgrey),
+        ]),
+        # Signature blocks side by side
+        'signatures': rl.TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER')] + body),
+    }
+
+
+class PDFDocument:
+    """
+    An A4 document assembled from the shared styles. ``write`` streams it
+    into any file-like object (an ``HttpResponse``, an open file), so callers
+    never need to hold an extra copy of the PDF.
+    """
+
+    def __init__(self, title=''):
+        self.title = title
+        self.elements = []
+
+    def heading(self, text, level=1):
+        rl = _reportlab()
+        self.elements.append(rl.Paragraph(text, _styles()['paragraphs'][f'Heading{level}']))
+        return self
+
+    def spacer(self, height=20):
+        self.elements.append(_reportlab().Spacer(1, height))
+        return self
+
+    def table(self, rows, style, col_widths):
+        """``rows`` laid out with the named shared ``style``; ``col_widths`` are in inches"""
+        rl = _reportlab()
+        table = rl.Table(rows, colWidths=[width * rl.inch for width in col_widths])
+        table.setStyle(_styles()[style])
+        self.elements.append(table)
+        return self
+
+    def write(self, output):
+        rl = _reportlab()
+        # Page frames hold layout state while a document builds, so each
+        # document gets its own template
+        rl.SimpleDocTemplate(output, pagesize=rl.A4, title=self.title).build(list(self.elements))
+
+    def render(self):
+        """The PDF as bytes"""
+        buffer = BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.template import Context, Template, TemplateDoesNotExist
+from django.template.base import TextNode
+from django.template.loader import get_template
+from django.template.loader_tags import BlockNode, ExtendsNode
+from django.utils.html import strip_tags
+
+CONTENT_BLOCK = 'content'
+_CONTENT_MARKER = '\x00email-content\x00'
+
+# Compiled templates and pre-rendered layouts, per process. Left empty under
+# DEBUG so template edits show up without a restart.
+_cache = {}
+
+
+def render_email(template_name, context):
+    """
+    Render ``emails/<name>.html`` and its plaintext alternative and return
+    ``(html_message, plain_message)``.
+
+    Templates are compiled once per process. A template that only fills the
+    ``content`` block of a static layout (``emails/base_email.html``) has the
+    layout rendered once and reused, so each message only renders its own
+    block. The plaintext part comes from ``emails/<name>.txt``, falling back to
+    stripping the HTML for templates without one.
+    """
+    html_message = _render_html(template_name, context)
+
+    text_template = _compiled(template_name.rsplit('.', 1)[0] + '.txt')
+    if text_template is None:
+        return html_message, strip_tags(html_message)
+    return html_message, _render(text_template, context).strip()
+
+
+def _render_html(template_name, context):
+    template = _compiled(template_name)
+    if template is None:
+        raise TemplateDoesNotExist(template_name)
+
+    layout = _cached(('layout', template_name), lambda: _split_layout(template))
+    if not layout:
+        return _render(template, context)
+
+    head, block, tail = layout
+    render_context = Context(context)
+    with render_context.render_context.push_state(template):
+        with render_context.bind_template(template):
+            return head + block.nodelist.render(render_context) + tail
+
+
+def _render(template, context):
+    return template.render(Context(context))
+
+
+def _compiled(template_name):
+    def load():
+        try:
+            return get_template(template_name).template
+        except TemplateDoesNotExist:
+            return None
+    return _cached(('template', template_name), load)
+
+
+def _cached(key, factory):
+    if settings.DEBUG:
+        return factory()
+    if key not in _cache:
+        _cache[key] = factory()
+    return _cache[key]
+
+
+def _split_layout(template):
+    """
+    ``(head, content_block, tail)`` when ``template`` extends a layout that has
+    no template logic besides its blocks and overrides only the content block;
+    otherwise None and the template is rendered in full.
+    """
+    extends = next((node for node in template.nodelist if isinstance(node, ExtendsNode)), None)
+    if extends is None or set(extends.blocks) != {CONTENT_BLOCK} or extends.parent_name.filters:
+        return None
+
+    parent_name = extends.parent_name.resolve(Context())
+    parent = _compiled(parent_name)
+    if parent is None or not _is_static(parent.nodelist):
+        return None
+
+    layout = Template(
+        f"{{% extends '{parent_name}' %}}{{% block {CONTENT_BLOCK} %}}{_CONTENT_MARKER}{{% endblock %}}"
+    ).render(Context())
+    head, tail = layout.split(_CONTENT_MARKER)
+    return head, extends.blocks[CONTENT_BLOCK], tail
+
+
+def _is_static(nodelist):
+    """True when ``nodelist`` renders the same for every context, ignoring the content block"""
+    for node in nodelist:
+        if isinstance(node, TextNode):
+            continue
+        if isinstance(node, BlockNode) and (node.name == CONTENT_BLOCK or _is_static(node.nodelist)):
+            continue
+        return False
+    return True
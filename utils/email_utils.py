@@ -1,16 +1,16 @@
-from django.core.mail import send_mail
+from notifications.outbox import enqueue_mail
 from django.conf import settings
-from django.template.loader import render_to_string
+from utils.email_rendering import render_email
 
 def send_tenant_creation_email(tenant):
     """Send welcome email to newly created tenant"""
     subject = 'Welcome to RMS - Your Account Has Been Created'
-    html_message = render_to_string('emails/tenant_welcome.html', {
+    html_message, plain_message = render_email('emails/tenant_welcome.html', {
         'tenant': tenant,
     })
-    send_mail(
+    enqueue_mail(
         subject=subject,
-        message='',
+        message=plain_message,
         html_message=html_message,
         from_email=settings.EMAIL_HOST_USER,
         recipient_list=[tenant.user.email],
@@ -20,7 +20,7 @@ def send_tenant_creation_email(tenant):
 def send_lease_creation_email(lease):
     """Send notification email when a new lease is created"""
     subject = 'New Lease Agreement Created'
-    html_message = render_to_string('emails/lease_created.html', {
+    html_message, plain_message = render_email('emails/lease_created.html', {
         'lease': lease,
     })
     # Send to both tenant and property owner
@@ -28,9 +28,9 @@ def send_lease_creation_email(lease):
         lease.tenant.user.email,
         lease.property.owner.user.email
     ]
-    send_mail(
+    enqueue_mail(
         subject=subject,
-        message='',
+        message=plain_message,
         html_message=html_message,
         from_email=settings.EMAIL_HOST_USER,
         recipient_list=recipient_list,
@@ -40,12 +40,12 @@ def send_lease_creation_email(lease):
 def send_invoice_creation_email(invoice):
     """Send notification email when a new invoice is generated"""
     subject = 'New Invoice Generated'
-    html_message = render_to_string('emails/invoice_created.html', {
+    html_message, plain_message = render_email('emails/invoice_created.html', {
         'invoice': invoice,
     })
-    send_mail(
+    enqueue_mail(
         subject=subject,
-        message='',
+        message=plain_message,
         html_message=html_message,
         from_email=settings.EMAIL_HOST_USER,
         recipient_list=[invoice.tenant.user.email],
@@ -0,0 +1,120 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class CursorPage:
+    """One page of a ``CursorPaginator``, with cursors for its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset pagination: each page continues from the ordering values of the
+    last row seen (``WHERE (created_at, id) < (...)``) instead of an OFFSET,
+    so deep pages cost the same as the first one and no COUNT is needed.
+    ``ordering`` must end in a unique field (e.g. ``('-created_at', '-id')``)
+    and should match an index on the queryset's filter.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def get_page(self, cursor=None):
+        """
+        Page after (or, for a previous-page cursor, before) ``cursor``; the
+        first page when the cursor is missing or invalid.
+        """
+        position = self.decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position['direction'] == 'previous'
+
+        queryset = self.queryset
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position['values'], backwards))
+            except (ValidationError, ValueError, TypeError):
+                # Tampered cursor values that don't parse for their field
+                return self.get_page()
+        ordering = [self._flip(field) for field in self.ordering] if backwards else self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows)
+
+        # Walking forwards there is a previous page whenever we came from a cursor,
+        # and walking backwards there is always a next page
+        has_next = has_more if not backwards else True
+        has_previous = position is not None if not backwards else has_more
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'next') if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'previous') if has_previous else None
+        )
+
+    def encode_cursor(self, obj, direction):
+        values = [self._serialize(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, values = payload['d'], payload['v']
+            if direction not in ('next', 'previous') or not isinstance(values, list) or len(values) != len(self.fields):
+                return None
+        except (ValueError, TypeError, KeyError, binascii.Error):
+            return None
+        return {'direction': direction, 'values': values}
+
+    def _after(self, values, backwards):
+        """
+        Rows strictly past ``values`` in the paging direction, expanded as
+        (a < x) OR (a = x AND b < y) ... so each branch can use the index
+        """
+        condition = Q()
+        equal = {}
+        for field, ordering, value in zip(self.fields, self.ordering, values):
+            descending = ordering.startswith('-') != backwards
+            condition |= Q(**equal, **{f"{field}__{'lt' if descending else 'gt'}": value})
+            equal[field] = value
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _serialize(value):
+        # str() keeps datetime microseconds (DjangoJSONEncoder would drop them
+        # and skip rows); the ORM parses the string back when filtering
+        return value if isinstance(value, (int, str)) else str(value)
@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+# A claimed row not finished within this long is assumed to belong to a
+# worker that died, and is handed out again
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def claim_rows(model, ready, ordering, claimed_status, batch_size, now=None, claim_timeout=CLAIM_TIMEOUT):
+    """
+    Mark up to ``batch_size`` rows of ``model`` matching ``ready`` (a ``Q``,
+    taken in ``ordering``) as ``claimed_status`` by this worker and return
+    them, topping the batch up with rows left in ``claimed_status`` for longer
+    than ``claim_timeout``. Rows locked by another worker are skipped, so
+    several workers can drain the same table side by side. ``model`` needs
+    ``status`` and ``claimed_at`` fields.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True).filter(ready).order_by(*ordering)[:batch_size]
+        )
+        stale = model.objects.select_for_update(skip_locked=True).filter(
+            status=claimed_status, claimed_at__lt=now - claim_timeout
+        ).order_by('claimed_at', 'id')[:max(batch_size - len(rows), 0)]
+        rows += list(stale)
+        model.objects.filter(id__in=[row.id for row in rows]).update(status=claimed_status, claimed_at=now)
+    return rows
+
+
+class QueueWorkerCommand(BaseCommand):
+    """
+    Management command that processes a queue one claimed batch at a time,
+    sleeping while it is empty, until interrupted (or, with --once, until
+    nothing is left). Subclasses set the defaults and messages below and
+    implement ``process_batch``.
+    """
+    item_name = 'items'
+    batch_size = 100
+    sleep = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=self.batch_size,
+                            help=f'Number of {self.item_name} claimed per batch')
+        parser.add_argument('--sleep', type=float, default=self.sleep,
+                            help=f'Seconds to wait when no {self.item_name} are queued')
+        parser.add_argument('--once', action='store_true',
+                            help='Process what is queued now and exit instead of running forever')
+
+    def process_batch(self, batch_size):
+        """Handle one claimed batch and return (done, failed) counts"""
+        raise NotImplementedError
+
+    def batch_message(self, done, failed):
+        return f'Processed {done} {self.item_name}, {failed} failed'
+
+    def summary_message(self, done, failed):
+        return f'Processed {done} {self.item_name} ({failed} failures)'
+
+    def handle(self, *args, **options):
+        total_done = total_failed = 0
+        try:
+            while True:
+                done, failed = self.process_batch(options['batch_size'])
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(self.batch_message(done, failed))
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(self.summary_message(total_done, total_failed)))